@@ -1,8 +1,204 @@
+import atexit
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import partial
+from multiprocessing import get_all_start_methods, get_context, resource_tracker, shared_memory
+
+import numpy as np
+
+# bytes read at a time by the block-based alignment loaders
+BLOCK_SIZE = 16 * 1024 * 1024
+
+# magic bytes used to detect compressed inputs
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# threads used to inflate bgzf blocks, and how many blocks each thread inflates per task
+DECOMPRESSION_THREADS = min(8, os.cpu_count() or 1)
+BGZF_BATCH = 16
+
+# byte-range shards per worker process, and the smallest shard worth sending to a worker
+SHARDS_PER_WORKER = 4
+MIN_SHARD_SIZE = 4 * 1024 * 1024
+
+# bytes of alignment text covered by one entry of a region index
+INDEX_CHUNK_SIZE = 64 * 1024
+
+# bumped whenever the layout of cached alignment arrays changes
+CACHE_VERSION = 1
+
+# default bound on the size of the alignment cache directory, in bytes
+CACHE_SIZE = 20 * 1024 ** 3
+
+# number of alignments in view above which the dot plot shows pre-rendered identity images, and how many image resolutions to embed
+OVERVIEW_THRESHOLD = 200000
+OVERVIEW_LEVELS = 3
+
+# most annotation features drawn individually; views holding more show merged coverage blocks per strand
+ANNOTATION_FEATURE_LIMIT = 2000
+
+# orange to red to black identity colour scale, as (position, colour) stops
+IDENTITY_COLORS = [(0, '#ffa500'), (0.5, '#ff0000'), (1, '#000000')]
+
+# rendering libraries, imported only when a plot is drawn
+RENDERING_MODULES = ("bokeh.plotting", "bokeh.models", "matplotlib.pyplot")
+
+# columns of a batch manifest: at least one alignment file per row, plus any of the optional bed files and a plot title
+MANIFEST_ALIGNMENT_COLUMNS = ("paf_file", "coords_file", "delta_file")
+MANIFEST_REQUIRED_COLUMNS = ("x_index_file", "y_index_file", "output_prefix")
+MANIFEST_BED_COLUMNS = ("x_feature_bed_file", "y_feature_bed_file", "x_track_bed_file", "y_track_bed_file", "x_annotation_bed_file", "y_annotation_bed_file")
+
+# segment grid of the serve mode: segments per cell aimed for on its finest level, and the most levels it can have
+GRID_CELL_SEGMENTS = 16
+GRID_MAX_LEVEL = 12
+
+# serve mode port, and the most alignments sent to the browser for one view
+SERVE_PORT = 5006
+SERVE_SEGMENT_LIMIT = 100000
+
+# furthest a tap in the serve mode can be from an alignment, in pixels, to pick it
+SERVE_TAP_DISTANCE = 5
+
+# files written for each plot
+OUTPUTS = ("html", "png", "svg")
+
+# columns (and dtypes) of the parsed alignment arrays; query/subject hold contig codes
+ALIGNMENT_COLUMNS = {
+    'query_start': np.int64,
+    'query_end': np.int64,
+    'subject_start': np.int64,
+    'subject_end': np.int64,
+    'identity': np.float32,
+    'query': np.int32,
+    'subject': np.int32
+    }
+
+class ChunkReader(io.RawIOBase):
+    """read-only file object over an iterator of decompressed byte chunks"""
+
+    def __init__(self, chunks, handle):
+        self.chunks = chunks
+        self.handle = handle
+        self.pending = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not len(self.pending):
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return 0
+            self.pending = memoryview(chunk)
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self.chunks.close()
+            self.handle.close()
+        super().close()
+
+def read_ahead(chunks):
+    """fetch the next chunk on a background thread while the current one is being parsed"""
+    with ThreadPoolExecutor(1) as pool:
+        future = pool.submit(next, chunks, b"")
+        while True:
+            chunk = future.result()
+            if not chunk:
+                break
+            future = pool.submit(next, chunks, b"")
+            yield chunk
+
+def is_bgzf(header):
+    """check for the gzip extra subfield ('BC') that marks a bgzf block"""
+    return len(header) >= 18 and header[:2] == GZIP_MAGIC and bool(header[3] & 4) and header[12:14] == b"BC"
+
+def bgzf_blocks(handle):
+    """yield the raw deflate payload of every bgzf block in a file"""
+    while True:
+        header = handle.read(18)
+        if not header:
+            break
+        if not is_bgzf(header):
+            raise ValueError("malformed bgzf block")
+        block_size = int.from_bytes(header[16:18], "little") + 1
+        yield handle.read(block_size - 18)[:-8]
+
+def inflate_blocks(payloads):
+    """decompress a batch of raw deflate payloads"""
+    return b"".join(zlib.decompress(payload, -15) for payload in payloads)
+
+def bgzf_chunks(handle, threads=DECOMPRESSION_THREADS):
+    """inflate bgzf blocks on a thread pool, yielding the decompressed data in file order"""
+    pending = deque()
+    batch = []
+    with ThreadPoolExecutor(threads) as pool:
+        for payload in bgzf_blocks(handle):
+            batch.append(payload)
+            if len(batch) == BGZF_BATCH:
+                pending.append(pool.submit(inflate_blocks, batch))
+                batch = []
+            #keep a bounded number of batches in flight
+            if len(pending) > 2 * threads:
+                yield pending.popleft().result()
+        pending.append(pool.submit(inflate_blocks, batch))
+        while pending:
+            yield pending.popleft().result()
+
+def zstd_reader(handle):
+    """open a zstd decompressing reader, using the standard library where available"""
+    try:
+        from compression import zstd
+        return zstd.ZstdFile(handle)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("reading zstd compressed input requires python 3.14 or the zstandard package")
+    return zstandard.ZstdDecompressor().stream_reader(handle)
+
+def open_input(path, threads=DECOMPRESSION_THREADS):
+    """open a plain, gzip, bgzip or zstd compressed file (or stdin, as '-') for binary reading, detected from its magic bytes"""
+    handle = sys.stdin.buffer if path == "-" else open(path, 'rb')
+    header = handle.peek(18)[:18]
+    if is_bgzf(header):
+        chunks = bgzf_chunks(handle, threads)
+    elif header.startswith(GZIP_MAGIC):
+        decompressed = gzip.GzipFile(fileobj=handle)
+        chunks = read_ahead(iter(lambda: decompressed.read(BLOCK_SIZE), b""))
+    elif header.startswith(ZSTD_MAGIC):
+        decompressed = zstd_reader(handle)
+        chunks = read_ahead(iter(lambda: decompressed.read(BLOCK_SIZE), b""))
+    elif path == "-":
+        #keep draining the pipe while a block is parsed, so the aligner writing to it is never held up
+        chunks = read_ahead(iter(lambda: handle.read(BLOCK_SIZE), b""))
+    else:
+        return handle
+    return io.BufferedReader(ChunkReader(chunks, handle), buffer_size=1024 * 1024)
+
+def open_text_input(path):
+    """open a plain or compressed text file for reading line by line"""
+    return io.TextIOWrapper(open_input(path))
+
 def index_assembly(index_file):
     """use samtools fai file to generate"""
     contig_dict = {}
     contig_list = []
-    with open(index_file, 'r') as index:
+    with open_text_input(index_file) as index:
         for line in index:
             row = line.rstrip("\n").split("\t")
             contig_list.append(row[0])
@@ -17,231 +213,1492 @@ def index_assembly(index_file):
     cumulative_length_dict["end"] = cumulative_length_dict[contig] + contig_dict[contig]
     return cumulative_length_dict
 
-def parse_nucmer_coords_file(coords_file, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict):    
-    """parse nucmer (-T -l) coordinates file"""
-    query_positions = []
-    subject_positions = []
-    identities = []
-    strands = []
-    queries = []
-    subjects = []
-    with open(coords_file, 'r') as f:
-        for line in f:
-            if line.startswith("/"): 
-                pass
-            elif line.startswith("NUCMER"):
-                pass
-            else:
-                line = line.rstrip("\n")
-                fields = line.split("\t")
-                if len(fields) == 1:
-                    pass
-                elif fields[0] == "[S1]":
-                    pass
-                elif float(fields[6]) > float(threshold) and fields[9] in x_cumulative_length_dict.keys() and fields[10] in y_cumulative_length_dict.keys() and abs(int(fields[0]) - int(fields[1])) >= size_threshold:
-                    current_query_id = fields[9]
-                    queries.append(current_query_id)
-                    current_subject_id = fields[10]
-                    subjects.append(current_subject_id)
-                    query_start = int(fields[0]) + int(x_cumulative_length_dict[current_query_id])
-                    query_end = int(fields[1]) + int(x_cumulative_length_dict[current_query_id])
-                    subject_start = int(fields[2]) + int(y_cumulative_length_dict[current_subject_id])
-                    subject_end = int(fields[3]) + int(y_cumulative_length_dict[current_subject_id])
-                    identity = float(fields[6])
-                    if subject_end > subject_start:    
-                        strand = "+"
-                    elif subject_start > subject_end:
-                        strand = "-"
-                    query_positions.append((query_start, query_end))
-                    subject_positions.append((subject_start, subject_end))
-                    identities.append(identity)
-                    strands.append(strand)
+def read_delta_blocks(handle, block_size=BLOCK_SIZE):
+    """yield blocks of whole delta alignment records, each starting with the header of its sequence pair"""
+    remainder = b""
+    header = b""
+    while True:
+        block = handle.read(block_size)
+        if not block:
+            break
+        block = remainder + block
+        #alignment records end with a line holding a single 0
+        cut = block.rfind(b"\n0\n") + 3
+        if cut < 3:
+            remainder = block
+            continue
+        remainder = block[cut:]
+        yield header + block[:cut]
+        last_header = block.rfind(b"\n>", 0, cut) + 1
+        if last_header or block.startswith(b">"):
+            header = block[last_header:block.index(b"\n", last_header) + 1]
+    if remainder:
+        yield header + remainder
+
+def read_blocks(handle, block_size=BLOCK_SIZE, limit=None):
+    """yield large blocks of whole lines from a binary file handle, stopping after limit bytes if given"""
+    remainder = b""
+    while True:
+        if limit is not None:
+            block = handle.read(min(block_size, limit))
+            limit -= len(block)
+        else:
+            block = handle.read(block_size)
+        if not block:
+            break
+        block = remainder + block
+        cut = block.rfind(b"\n") + 1
+        remainder = block[cut:]
+        if cut:
+            yield block[:cut]
+    if remainder:
+        yield remainder
+
+def parse_region(region):
+    """parse a samtools-style region (contig, contig:start-end, commas allowed) into a 0-based half-open tuple"""
+    contig, _, interval = region.rpartition(":") if ":" in region else (region, "", "")
+    if not interval:
+        return region, 0, None
+    start, _, end = interval.replace(",", "").partition("-")
+    return contig, max(int(start) - 1, 0), int(end) if end else None
+
+def restrict_index(cumulative_length_dict, region):
+    """recompute cumulative offsets so that only the region's contig is plotted, with the region starting at zero"""
+    contig, start, end = region
+    if contig not in cumulative_length_dict or contig == "end":
+        raise ValueError(f"{contig} is not in the index file")
+    contigs = list(cumulative_length_dict)
+    length = cumulative_length_dict[contigs[contigs.index(contig) + 1]] - cumulative_length_dict[contig]
+    end = length if end is None else min(end, length)
+    if start >= end:
+        raise ValueError(f"{contig}:{start + 1}-{end} is an empty region")
+    return {contig: -start, "end": end - start}, (contig, start, end)
+
+def contig_codes(cumulative_length_dict):
+    """sorted contig names (as bytes) with their codes, and offsets indexed by code"""
+    names = np.array([contig.encode() for contig in cumulative_length_dict], dtype=bytes)
+    order = np.argsort(names, kind="stable")
+    offsets = np.fromiter(cumulative_length_dict.values(), dtype=np.int64, count=len(cumulative_length_dict))
+    return names[order], order.astype(np.int32), offsets
+
+def encode_contigs(names, sorted_names, sorted_codes):
+    """translate an array of contig names into integer codes, -1 for names not in the index"""
+    if len(sorted_names) == 0:
+        return np.full(len(names), -1, dtype=np.int32)
+    position = np.minimum(np.searchsorted(sorted_names, names), len(sorted_names) - 1)
+    return np.where(sorted_names[position] == names, sorted_codes[position], -1).astype(np.int32)
+
+def line_bounds(buffer):
+    """locate the start and end of every line in a byte block"""
+    line_ends = np.flatnonzero(buffer == 10)
+    if len(buffer) and buffer[-1] != 10:
+        line_ends = np.append(line_ends, len(buffer))
+    line_starts = np.concatenate(([0], line_ends[:-1] + 1)).astype(np.int64)
+    #ignore windows line endings
+    carriage_return = np.zeros(len(line_ends), dtype=bool)
+    has_content = line_ends > line_starts
+    carriage_return[has_content] = buffer[line_ends[has_content] - 1] == 13
+    line_ends = line_ends - carriage_return
+    return line_starts, line_ends
+
+def split_fields(buffer, columns, min_fields, separator=9, lines=None):
+    """locate the requested columns (tab-separated by default) of every line, or of the given lines, in a byte block"""
+    line_starts, line_ends = line_bounds(buffer) if lines is None else lines
+    tabs = np.flatnonzero(buffer == separator)
+    first_tab = np.searchsorted(tabs, line_starts)
+    tab_counts = np.searchsorted(tabs, line_ends) - first_tab
+    #skip blank, header and truncated lines
+    complete = tab_counts >= min_fields - 1
+    line_starts, line_ends, first_tab, tab_counts = line_starts[complete], line_ends[complete], first_tab[complete], tab_counts[complete]
+    bounds = {}
+    for column in columns:
+        starts = line_starts if column == 0 else tabs[first_tab + column - 1] + 1
+        ends = np.where(tab_counts > column, tabs[np.minimum(first_tab + column, len(tabs) - 1)], line_ends) if len(tabs) else line_ends
+        bounds[column] = (starts, ends)
+    return line_starts, line_ends, bounds
+
+def field_strings(buffer, starts, ends):
+    """gather variable-length fields into a fixed-width numpy bytes array"""
+    width = max(int((ends - starts).max()), 1) if len(starts) else 1
+    offsets = starts[:, None] + np.arange(width)
+    characters = buffer[np.minimum(offsets, len(buffer) - 1)]
+    characters[offsets >= ends[:, None]] = 0
+    return characters.view(f"S{width}").ravel()
+
+def field_integers(buffer, starts, ends):
+    """parse variable-length unsigned integer fields straight from their digits"""
+    width = max(int((ends - starts).max()), 1) if len(starts) else 1
+    offsets = ends[:, None] - width + np.arange(width)
+    digits = buffer[np.maximum(offsets, 0)].astype(np.int64) - 48
+    digits[offsets < starts[:, None]] = 0
+    if ((digits < 0) | (digits > 9)).any():
+        raise ValueError("non-numeric value in an integer column")
+    return digits @ (10 ** np.arange(width - 1, -1, -1, dtype=np.int64))
+
+def tag_values(buffer, tag, line_starts, line_ends):
+    """find a sam-style tag (e.g. b"de:f:") once per line and return its value per line, nan if absent"""
+    values = np.full(len(line_starts), np.nan)
+    pattern = np.frombuffer(b"\t" + tag, dtype=np.uint8)
+    hits = np.flatnonzero(buffer[:len(buffer) - len(pattern) + 1] == pattern[0])
+    for i in range(1, len(pattern)):
+        hits = hits[buffer[hits + i] == pattern[i]]
+    if len(hits) == 0 or len(line_starts) == 0:
+        return values
+    line = np.searchsorted(line_starts, hits, side="right") - 1
+    starts = hits + len(pattern)
+    in_line = (line >= 0) & (starts <= line_ends[np.maximum(line, 0)])
+    line, starts = line[in_line], starts[in_line]
+    tabs = np.flatnonzero(buffer == 9)
+    next_tab = np.searchsorted(tabs, starts)
+    ends = np.minimum(np.where(next_tab < len(tabs), tabs[np.minimum(next_tab, len(tabs) - 1)], len(buffer)), line_ends[line])
+    values[line] = field_strings(buffer, starts, ends).astype(np.float64)
+    return values
+
+def shift_alignments(identity, query, subject, query_start, query_end, subject_start, subject_end, threshold, size_threshold, x_contigs, y_contigs):
+    """apply the identity, size and contig filters to a chunk and shift it to cumulative coordinates"""
+    mask = (identity > float(threshold)) & (query >= 0) & (subject >= 0) & (np.abs(query_start - query_end) >= size_threshold)
+    query = query[mask]
+    subject = subject[mask]
+    return {
+        'query_start': query_start[mask] + x_contigs[2][query],
+        'query_end': query_end[mask] + x_contigs[2][query],
+        'subject_start': subject_start[mask] + y_contigs[2][subject],
+        'subject_end': subject_end[mask] + y_contigs[2][subject],
+        'identity': identity[mask].astype(np.float32),
+        'query': query,
+        'subject': subject
+        }
+
+def parse_nucmer_coords_block(block, threshold, size_threshold, x_contigs, y_contigs):
+    """parse a block of nucmer (-T -l) coordinate lines into filtered, offset-shifted numpy columns"""
+    buffer = np.frombuffer(block, dtype=np.uint8)
+    line_starts, line_ends, bounds = split_fields(buffer, (0, 1, 2, 3, 6, 9, 10), 11)
+    #skip the [S1] [E1] ... column header
+    rows = buffer[line_starts] != ord("[")
+    bounds = {column: (starts[rows], ends[rows]) for column, (starts, ends) in bounds.items()}
+    identity = field_strings(buffer, *bounds[6]).astype(np.float64)
+    query = encode_contigs(field_strings(buffer, *bounds[9]), x_contigs[0], x_contigs[1])
+    subject = encode_contigs(field_strings(buffer, *bounds[10]), y_contigs[0], y_contigs[1])
+    query_start, query_end, subject_start, subject_end = (field_integers(buffer, *bounds[i]) for i in (0, 1, 2, 3))
+    return shift_alignments(identity, query, subject, query_start, query_end, subject_start, subject_end, threshold, size_threshold, x_contigs, y_contigs)
+
+def parse_paf_block(block, threshold, size_threshold, x_contigs, y_contigs):
+    """parse a block of paf lines into filtered, offset-shifted numpy columns"""
+    buffer = np.frombuffer(block, dtype=np.uint8)
+    line_starts, line_ends, bounds = split_fields(buffer, (0, 2, 3, 5, 7, 8), 12)
+    identity = 100 - (tag_values(buffer, b"de:f:", line_starts, line_ends) * 100)
+    query = encode_contigs(field_strings(buffer, *bounds[0]), x_contigs[0], x_contigs[1])
+    subject = encode_contigs(field_strings(buffer, *bounds[5]), y_contigs[0], y_contigs[1])
+    query_start, query_end, subject_start, subject_end = (field_integers(buffer, *bounds[i]) for i in (2, 3, 7, 8))
+    return shift_alignments(identity, query, subject, query_start, query_end, subject_start, subject_end, threshold, size_threshold, x_contigs, y_contigs)
+
+def parse_delta_block(block, threshold, size_threshold, x_contigs, y_contigs):
+    """parse a block of whole nucmer delta records into filtered, offset-shifted numpy columns"""
+    buffer = np.frombuffer(block, dtype=np.uint8)
+    line_starts, line_ends = line_bounds(buffer)
+    non_empty = line_ends > line_starts
+    line_starts, line_ends = line_starts[non_empty], line_ends[non_empty]
+    first = buffer[line_starts]
+    spaces = np.flatnonzero(buffer == 32)
+    space_counts = np.searchsorted(spaces, line_ends) - np.searchsorted(spaces, line_starts)
+    is_digit = (first >= 48) & (first <= 57)
+    headers = np.flatnonzero(first == ord(">"))
+    records = np.flatnonzero((space_counts == 6) & is_digit)
+    deletions = np.flatnonzero((space_counts == 0) & (first == ord("-")))
+    #sequence pair of each alignment record, from the closest preceding '>' header
+    names = [block[start + 1:end].split() for start, end in zip(line_starts[headers].tolist(), line_ends[headers].tolist())]
+    pair_query = encode_contigs(np.array([name[0] for name in names] + [b""], dtype=bytes), x_contigs[0], x_contigs[1])
+    pair_subject = encode_contigs(np.array([name[1] for name in names] + [b""], dtype=bytes), y_contigs[0], y_contigs[1])
+    pair = np.searchsorted(line_starts[headers], line_starts[records]) - 1
+    query = pair_query[pair]
+    subject = pair_subject[pair]
+    _, _, bounds = split_fields(buffer, range(5), 7, separator=32, lines=(line_starts[records], line_ends[records]))
+    query_start, query_end, subject_start, subject_end, errors = (field_integers(buffer, *bounds[i]) for i in range(5))
+    #negative indels are gaps in the reference, which add alignment columns beyond the reference span
+    owner = np.searchsorted(line_starts[records], line_starts[deletions]) - 1
+    reference_gaps = np.bincount(owner[owner >= 0], minlength=len(records))
+    columns = np.abs(query_end - query_start) + 1 + reference_gaps
+    identity = np.round((columns - errors) / columns * 100, 2)
+    return shift_alignments(identity, query, subject, query_start, query_end, subject_start, subject_end, threshold, size_threshold, x_contigs, y_contigs)
+
+# query contig, start and end columns, and the minimum field count, of the alignment formats that can be region-indexed
+INDEXED_COLUMNS = {
+    parse_paf_block: (0, 2, 3, 12),
+    parse_nucmer_coords_block: (9, 0, 1, 11)
+    }
+
+def build_alignment_index(alignment_file, parse_block):
+    """scan an alignment file once, recording the byte range, query contig and query extent of each run of lines"""
+    contig_column, start_column, end_column, min_fields = INDEXED_COLUMNS[parse_block]
+    entries = {'contig': [], 'start': [], 'end': [], 'offset': [], 'stop': []}
+    offset = 0
+    with open(alignment_file, 'rb') as f:
+        for block in read_blocks(f):
+            buffer = np.frombuffer(block, dtype=np.uint8)
+            line_starts, line_ends, bounds = split_fields(buffer, (contig_column, start_column, end_column), min_fields)
+            if parse_block is parse_nucmer_coords_block:
+                rows = buffer[line_starts] != ord("[")
+                line_starts, line_ends = line_starts[rows], line_ends[rows]
+                bounds = {column: (starts[rows], ends[rows]) for column, (starts, ends) in bounds.items()}
+            if len(line_starts):
+                contigs = field_strings(buffer, *bounds[contig_column])
+                starts, ends = field_integers(buffer, *bounds[start_column]), field_integers(buffer, *bounds[end_column])
+                #a new entry begins whenever the contig changes or the current entry covers INDEX_CHUNK_SIZE bytes
+                run_start = np.flatnonzero(np.concatenate(([True], contigs[1:] != contigs[:-1])))
+                run = np.repeat(np.arange(len(run_start)), np.diff(np.append(run_start, len(contigs))))
+                chunk = run * (int(line_ends[-1]) // INDEX_CHUNK_SIZE + 1) + (line_starts - line_starts[run_start][run]) // INDEX_CHUNK_SIZE
+                first = np.flatnonzero(np.concatenate(([True], chunk[1:] != chunk[:-1])))
+                entries['contig'].append(contigs[first])
+                entries['start'].append(np.minimum.reduceat(np.minimum(starts, ends), first))
+                entries['end'].append(np.maximum.reduceat(np.maximum(starts, ends), first))
+                entries['offset'].append(line_starts[first] + offset)
+                entries['stop'].append(line_ends[np.append(first[1:], len(chunk)) - 1] + offset)
+            offset += len(block)
+    return {key: np.concatenate(values) if values else np.empty(0, dtype=bytes if key == 'contig' else np.int64) for key, values in entries.items()}
+
+def load_alignment_index(alignment_file, parse_block):
+    """load the sidecar region index of an alignment file, (re)building it when missing or out of date"""
+    index_file = alignment_file + ".hdi.npz"
+    stat = os.stat(alignment_file)
+    if os.path.isfile(index_file):
+        index = dict(np.load(index_file))
+        if index['size'] == stat.st_size and index['mtime'] == stat.st_mtime_ns:
+            return index
+    index = build_alignment_index(alignment_file, parse_block)
+    index['size'] = np.int64(stat.st_size)
+    index['mtime'] = np.int64(stat.st_mtime_ns)
+    try:
+        with open(index_file, 'wb') as f:
+            np.savez(f, **index)
+    except OSError:
+        #the index still serves this run when its directory is read-only
+        pass
+    return index
+
+def region_blocks(alignment_file, index, region, block_size=BLOCK_SIZE):
+    """read only the byte ranges of an indexed alignment file that can overlap a region, as blocks of whole lines"""
+    contig, start, end = region
+    selected = (index['contig'] == contig.encode()) & (index['end'] >= start) & (index['start'] <= end)
+    pieces = []
+    size = 0
+    with open(alignment_file, 'rb') as f:
+        range_start = range_stop = None
+        for offset, stop in zip(index['offset'][selected].tolist(), index['stop'][selected].tolist()):
+            #merge ranges that are only separated by a line ending
+            if range_stop is not None and offset <= range_stop + 2:
+                range_stop = max(range_stop, stop)
+                continue
+            if range_stop is not None:
+                f.seek(range_start)
+                pieces.append(f.read(range_stop - range_start) + b"\n")
+                size += len(pieces[-1])
+                if size >= block_size:
+                    yield b"".join(pieces)
+                    pieces, size = [], 0
+            range_start, range_stop = offset, stop
+        if range_stop is not None:
+            f.seek(range_start)
+            pieces.append(f.read(range_stop - range_start) + b"\n")
+    if pieces:
+        yield b"".join(pieces)
+
+def region_alignments(chunk, x_cumulative_length_dict, y_cumulative_length_dict, x_region=None, y_region=None):
+    """keep the alignments of a chunk that overlap the plotted regions, which start at zero"""
+    mask = np.ones(len(chunk['query']), dtype=bool)
+    for region, cumulative_length_dict, start, end in ((x_region, x_cumulative_length_dict, 'query_start', 'query_end'), (y_region, y_cumulative_length_dict, 'subject_start', 'subject_end')):
+        if region:
+            mask &= (np.maximum(chunk[start], chunk[end]) > 0) & (np.minimum(chunk[start], chunk[end]) < cumulative_length_dict["end"])
+    return {column: values[mask] for column, values in chunk.items()}
+
+def stream_alignments(alignment_file, parse_block, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, chunk_size=BLOCK_SIZE, threads=DECOMPRESSION_THREADS):
+    """yield filtered, offset-shifted alignment chunks, reading chunk_size bytes of input at a time"""
+    x_contigs = contig_codes(x_cumulative_length_dict)
+    y_contigs = contig_codes(y_cumulative_length_dict)
+    #delta blocks must hold whole alignment records rather than just whole lines
+    block_reader = read_delta_blocks if parse_block is parse_delta_block else read_blocks
+    with open_input(alignment_file, threads) as f:
+        for block in block_reader(f, chunk_size):
+            yield parse_block(block, threshold, size_threshold, x_contigs, y_contigs)
+
+def collect_alignments(chunks):
+    """append alignment chunks to compact numpy buffers that grow only with the rows kept"""
+    capacity = 1024
+    size = 0
+    buffers = {column: np.empty(capacity, dtype=dtype) for column, dtype in ALIGNMENT_COLUMNS.items()}
+    for chunk in chunks:
+        rows = len(chunk['query'])
+        if size + rows > capacity:
+            capacity = max(2 * capacity, size + rows)
+            for column, buffer in buffers.items():
+                grown = np.empty(capacity, dtype=buffer.dtype)
+                grown[:size] = buffer[:size]
+                buffers[column] = grown
+        for column, buffer in buffers.items():
+            buffer[size:size + rows] = chunk[column]
+        size += rows
+    return {column: buffer[:size].copy() for column, buffer in buffers.items()}
+
+def shard_ranges(path, shards):
+    """split a file into contiguous byte ranges that start and end on line boundaries"""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as f:
+        for shard in range(1, shards):
+            f.seek(max(size * shard // shards, bounds[-1]))
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+def can_shard(path):
+    """byte-range sharding needs an uncompressed regular file"""
+    if not os.path.isfile(path):
+        return False
+    with open(path, 'rb') as f:
+        header = f.read(4)
+    return not header.startswith(GZIP_MAGIC) and not header.startswith(ZSTD_MAGIC)
+
+def create_shared_memory(size):
+    """create a shared memory block that outlives the worker process creating it"""
+    try:
+        return shared_memory.SharedMemory(create=True, size=size, track=False)
+    except TypeError:
+        #python < 3.13: stop the worker's resource tracker from removing the block when the worker exits
+        block = shared_memory.SharedMemory(create=True, size=size)
+        resource_tracker.unregister(block._name, "shared_memory")
+        return block
+
+def share_alignments(alignments):
+    """copy alignment columns into a new shared memory block and return its name and row count"""
+    rows = len(alignments['query'])
+    block = create_shared_memory(max(rows * sum(np.dtype(dtype).itemsize for dtype in ALIGNMENT_COLUMNS.values()), 1))
+    offset = 0
+    for column, dtype in ALIGNMENT_COLUMNS.items():
+        np.ndarray(rows, dtype=dtype, buffer=block.buf, offset=offset)[:] = alignments[column]
+        offset += rows * np.dtype(dtype).itemsize
+    name = block.name
+    block.close()
+    return name, rows
+
+def attach_alignments(name, rows):
+    """copy alignment columns out of a shared memory block and release it"""
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        alignments = {}
+        offset = 0
+        for column, dtype in ALIGNMENT_COLUMNS.items():
+            alignments[column] = np.ndarray(rows, dtype=dtype, buffer=block.buf, offset=offset).copy()
+            offset += rows * np.dtype(dtype).itemsize
+    finally:
+        block.close()
+        block.unlink()
+    return alignments
+
+def parse_shard(alignment_file, start, end, parse_block, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict):
+    """parse one byte range of an alignment file in a worker process, returning the result through shared memory"""
+    x_contigs = contig_codes(x_cumulative_length_dict)
+    y_contigs = contig_codes(y_cumulative_length_dict)
+    with open(alignment_file, 'rb') as f:
+        f.seek(start)
+        chunks = (parse_block(block, threshold, size_threshold, x_contigs, y_contigs) for block in read_blocks(f, limit=end - start))
+        return share_alignments(collect_alignments(chunks))
+
+def sharded_alignments(alignment_file, parse_block, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads):
+    """parse byte-range shards of an alignment file on a process pool, yielding their chunks in input order"""
+    shards = min(threads * SHARDS_PER_WORKER, max(1, os.path.getsize(alignment_file) // MIN_SHARD_SIZE))
+    with ProcessPoolExecutor(threads) as pool:
+        futures = [pool.submit(parse_shard, alignment_file, start, end, parse_block, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict) for start, end in shard_ranges(alignment_file, shards)]
+        merged = 0
+        try:
+            for future in futures:
+                alignments = attach_alignments(*future.result())
+                merged += 1
+                yield alignments
+        finally:
+            #release the shared memory of shards that were never merged
+            for future in futures[merged:]:
+                if not future.cancel() and future.exception() is None:
+                    attach_alignments(*future.result())
+
+def load_alignment_columns(alignment_file, parse_block, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads=1, x_region=None, y_region=None):
+    """load an alignment file into filtered numpy columns, sharding it across processes when threads > 1"""
+    if x_region and parse_block in INDEXED_COLUMNS and can_shard(alignment_file):
+        #only read the parts of the file that the x region's index entries point to
+        index = load_alignment_index(alignment_file, parse_block)
+        x_contigs = contig_codes(x_cumulative_length_dict)
+        y_contigs = contig_codes(y_cumulative_length_dict)
+        chunks = (parse_block(block, threshold, size_threshold, x_contigs, y_contigs) for block in region_blocks(alignment_file, index, x_region))
+    elif threads > 1 and parse_block is not parse_delta_block and can_shard(alignment_file):
+        chunks = sharded_alignments(alignment_file, parse_block, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads)
+    else:
+        chunks = stream_alignments(alignment_file, parse_block, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads=max(threads, DECOMPRESSION_THREADS))
+    if x_region or y_region:
+        chunks = (region_alignments(chunk, x_cumulative_length_dict, y_cumulative_length_dict, x_region, y_region) for chunk in chunks)
+    return collect_alignments(chunks)
+
+def load_nucmer_coords_columns(coords_file, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads=1):
+    """load a nucmer (-T -l) coordinates file into filtered numpy columns"""
+    return load_alignment_columns(coords_file, parse_nucmer_coords_block, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads)
+
+def load_delta_columns(delta_file, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads=1):
+    """load a nucmer delta file into filtered numpy columns"""
+    return load_alignment_columns(delta_file, parse_delta_block, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads)
+
+def load_paf_columns(paf_file, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads=1):
+    """load a paf file into filtered numpy columns"""
+    return load_alignment_columns(paf_file, parse_paf_block, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads)
+
+def alignment_cache_key(alignment_file, parse_block, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict):
+    """cache key from the input file's path, size and mtime, both indexes and the filters"""
+    stat = os.stat(alignment_file)
+    digest = hashlib.sha256()
+    for part in (CACHE_VERSION, parse_block.__name__, os.path.realpath(alignment_file), stat.st_size, stat.st_mtime_ns, float(threshold), float(size_threshold), list(x_cumulative_length_dict.items()), list(y_cumulative_length_dict.items())):
+        digest.update(repr(part).encode() + b"\0")
+    return digest.hexdigest()
+
+def read_alignment_cache(entry):
+    """memory-map the alignment columns stored in a cache entry"""
+    return {column: np.load(os.path.join(entry, column + ".npy"), mmap_mode='r') for column in ALIGNMENT_COLUMNS}
+
+def write_npy_entry(entry, columns):
+    """store columns as the .npy files of a directory entry, renaming the finished entry into place"""
+    temporary = f"{entry}.tmp{os.getpid()}"
+    os.makedirs(temporary, exist_ok=True)
+    for name, values in columns.items():
+        np.save(os.path.join(temporary, name + ".npy"), values)
+    try:
+        os.rename(temporary, entry)
+    except OSError:
+        #another run stored the same entry first
+        shutil.rmtree(temporary, ignore_errors=True)
+
+def write_alignment_cache(entry, alignments):
+    """store alignment columns as .npy files, renaming the finished entry into place"""
+    write_npy_entry(entry, {column: alignments[column] for column in ALIGNMENT_COLUMNS})
+
+def evict_alignment_cache(cache_dir, cache_size):
+    """remove the least recently used cache entries until the cache fits in cache_size bytes"""
+    entries = []
+    for name in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, name)
+        if os.path.isdir(entry) and ".tmp" not in name:
+            size = sum(os.path.getsize(os.path.join(entry, file)) for file in os.listdir(entry))
+            entries.append((os.path.getmtime(entry), size, entry))
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries):
+        if total <= cache_size:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+
+def cached_alignment_columns(alignment_file, parse_block, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads=1, cache_dir=None, cache_size=CACHE_SIZE, x_region=None, y_region=None):
+    """load alignment columns from the on-disk cache, parsing the file and storing the result on a miss"""
+    if cache_dir is None or not os.path.isfile(alignment_file):
+        return load_alignment_columns(alignment_file, parse_block, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads, x_region, y_region)
+    os.makedirs(cache_dir, exist_ok=True)
+    entry = os.path.join(cache_dir, alignment_cache_key(alignment_file, parse_block, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict))
+    if os.path.isdir(entry):
+        #mark the entry as recently used
+        os.utime(entry)
+        return read_alignment_cache(entry)
+    alignments = load_alignment_columns(alignment_file, parse_block, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads, x_region, y_region)
+    write_alignment_cache(entry, alignments)
+    evict_alignment_cache(cache_dir, cache_size)
+    return alignments
+
+def load_alignments(threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, coords_file=None, paf_file=None, delta_file=None, threads=1, cache_dir=None, cache_size=CACHE_SIZE, x_region=None, y_region=None):
+    """load the nucmer coords, nucmer delta or paf file into alignment columns, going through the cache if one is given"""
+    if paf_file:
+        return cached_alignment_columns(paf_file, parse_paf_block, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads, cache_dir, cache_size, x_region, y_region)
+    if delta_file:
+        return cached_alignment_columns(delta_file, parse_delta_block, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads, cache_dir, cache_size, x_region, y_region)
+    return cached_alignment_columns(coords_file, parse_nucmer_coords_block, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads, cache_dir, cache_size, x_region, y_region)
+
+def chain_alignments(alignments, gap):
+    """merge adjacent collinear alignments on the same contig pair and strand into chains with a length-weighted identity"""
+    reverse = alignments['subject_end'] < alignments['subject_start']
+    order = np.lexsort((alignments['query_start'], reverse, alignments['subject'], alignments['query']))
+    query_start, query_end, subject_start, subject_end, identity, query, subject = (alignments[column][order] for column in ALIGNMENT_COLUMNS)
+    reverse = reverse[order]
+    if not len(order):
+        return {**{column: alignments[column] for column in ALIGNMENT_COLUMNS}, 'members': np.zeros(0, dtype=np.int32)}
+    #sweep the sorted alignments, each one extending the chain of the one before it when both gaps are within the limit
+    query_gap = query_start[1:] - query_end[:-1]
+    subject_gap = np.where(reverse[1:], subject_end[:-1] - subject_start[1:], subject_start[1:] - subject_end[:-1])
+    extends = (query[1:] == query[:-1]) & (subject[1:] == subject[:-1]) & (reverse[1:] == reverse[:-1]) & (np.abs(query_gap) <= gap) & (np.abs(subject_gap) <= gap)
+    starts = np.flatnonzero(np.concatenate(([True], ~extends)))
+    chain_reverse = reverse[starts]
+    #chains of reverse alignments run from the highest subject start down to the lowest subject end
+    lowest_start = np.minimum.reduceat(subject_start, starts)
+    highest_start = np.maximum.reduceat(subject_start, starts)
+    lowest_end = np.minimum.reduceat(subject_end, starts)
+    highest_end = np.maximum.reduceat(subject_end, starts)
+    length = np.maximum(np.abs(query_end - query_start), 1)
+    return {
+        'query_start': np.minimum.reduceat(query_start, starts),
+        'query_end': np.maximum.reduceat(query_end, starts),
+        'subject_start': np.where(chain_reverse, highest_start, lowest_start),
+        'subject_end': np.where(chain_reverse, lowest_end, highest_end),
+        'identity': (np.add.reduceat(identity * length, starts) / np.add.reduceat(length, starts)).astype(np.float32),
+        'query': query[starts],
+        'subject': subject[starts],
+        'members': np.diff(np.append(starts, len(order))).astype(np.int32)
+        }
+
+def limit_alignments(alignments, max_alignments):
+    """keep the longest max_alignments alignments with a fair quota per contig pair, returning them and the number dropped per (query, subject) pair"""
+    if len(alignments['query']) <= max_alignments:
+        return alignments, {}
+    base = int(alignments['subject'].max()) + 1
+    key = alignments['query'].astype(np.int64) * base + alignments['subject']
+    #count the rows of each pair with one bincount over the pair keys, unless the keys are too sparse for one
+    if (int(alignments['query'].max()) + 1) * base <= 4 * len(key):
+        pair, counts = key, np.bincount(key)
+        pairs = np.arange(len(counts))
+    else:
+        pairs, pair, counts = np.unique(key, return_inverse=True, return_counts=True)
+    #largest quota that every pair can fill up to without exceeding max_alignments
+    low, high = 0, int(counts.max())
+    while low < high:
+        middle = (low + high + 1) // 2
+        if np.minimum(counts, middle).sum() <= max_alignments:
+            low = middle
+        else:
+            high = middle - 1
+    quotas = np.minimum(counts, low)
+    #hand the slots left over to pairs that still have alignments to spare
+    spare = max_alignments - int(quotas.sum())
+    quotas[np.flatnonzero(counts > low)[:spare]] += 1
+    #rank only the rows of pairs over their quota by length within the pair, dropping each pair's shortest
+    over = np.flatnonzero(quotas < counts)
+    rows = np.flatnonzero((quotas < counts)[pair])
+    length = np.abs(alignments['query_end'][rows] - alignments['query_start'][rows])
+    rows = rows[np.lexsort((length, pair[rows]))]
+    rank = np.arange(len(rows)) - np.repeat(np.cumsum(counts[over]) - counts[over], counts[over])
+    keep = np.ones(len(pair), dtype=bool)
+    keep[rows[rank < (counts - quotas)[pair[rows]]]] = False
+    dropped = {(int(key // base), int(key % base)): int(count) for key, count in zip(pairs[over], counts[over] - quotas[over])}
+    return {column: values[keep] for column, values in alignments.items()}, dropped
+
+def rasterise_segments(x0, y0, x1, y1, values, x_end, y_end, width, height):
+    """mean of values over the bins of a height x width grid that each segment passes through, NaN where none does"""
+    x0, y0, x1, y1 = (np.asarray(column, dtype=np.float64) for column in (x0, y0, x1, y1))
+    #sample every segment about once per bin it crosses
+    column_span = (x1 - x0) * (width / x_end)
+    row_span = (y1 - y0) * (height / y_end)
+    steps = np.ceil(np.maximum(np.abs(column_span), np.abs(row_span))).astype(np.int64) + 1
+    owner = np.repeat(np.arange(len(steps)), steps)
+    fraction = (np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)) / np.repeat(np.maximum(steps - 1, 1), steps)
+    columns = np.clip((x0[owner] * (width / x_end) + column_span[owner] * fraction).astype(np.int64), 0, width - 1)
+    rows = np.clip((y0[owner] * (height / y_end) + row_span[owner] * fraction).astype(np.int64), 0, height - 1)
+    bins = rows * width + columns
+    counts = np.bincount(bins, minlength=width * height)
+    sums = np.bincount(bins, weights=np.asarray(values, dtype=np.float64)[owner], minlength=width * height)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (sums / counts).reshape(height, width)
+
+def overview_images(x0, y0, x1, y1, identity, x_end, y_end, width, height, levels):
+    """rasterise alignments into identity images at levels resolutions, the coarsest width x height and each following one twice as fine on each axis
+    
+    Bins hold 0 when empty and 1-255 across the identity range, so each image is one byte per bin."""
+    low, high = float(identity.min()), float(identity.max())
+    images = []
+    for level in range(levels):
+        mean = rasterise_segments(x0, y0, x1, y1, identity, x_end, y_end, width << level, height << level)
+        codes = 1 + np.round((np.nan_to_num(mean, nan=low) - low) / max(high - low, 1e-9) * 254)
+        images.append(np.where(np.isnan(mean), 0, codes).astype(np.uint8))
+    return images
+
+def image_tiles(image, x_end, y_end, tile_width, tile_height):
+    """cut an overview image into tiles of tile_width x tile_height bins, with the extent each covers, leaving out the tiles without alignments"""
+    columns, rows = image.shape[1] // tile_width, image.shape[0] // tile_height
+    tiles = {'image': [], 'x': [], 'y': [], 'dw': [], 'dh': []}
+    for row in range(rows):
+        for column in range(columns):
+            tile = image[row * tile_height:(row + 1) * tile_height, column * tile_width:(column + 1) * tile_width]
+            if tile.any():
+                tiles['image'].append(np.ascontiguousarray(tile))
+                tiles['x'].append(column * x_end / columns)
+                tiles['y'].append(row * y_end / rows)
+                tiles['dw'].append(x_end / columns)
+                tiles['dh'].append(y_end / rows)
+    return tiles
+
+def alignment_segments(alignments):
+    """dot plot segments of alignment columns, reverse strand alignments running down from their subject start"""
+    q_start, q_end, s_start, s_end = alignments['query_start'], alignments['query_end'], alignments['subject_start'], alignments['subject_end']
+    return {'x0': q_start, 'x1': q_end, 'y0': s_start, 'y1': np.where(s_end >= s_start, s_end, s_start + (q_start - q_end))}
+
+def grid_levels(segments):
+    """number of levels of a segment grid below its single top cell, so the finest level holds about GRID_CELL_SEGMENTS segments per cell"""
+    return int(np.clip(np.ceil(np.log(max(segments, 1) / GRID_CELL_SEGMENTS) / np.log(4)), 0, GRID_MAX_LEVEL))
+
+def grid_keys(x0, y0, x1, y1, x_end, y_end, levels):
+    """grid key of each segment: the cell holding its lower left corner, on the finest level whose cells are at least as large as its bounding box
+    
+    Level l splits each axis into 2**l cells and keys run level by level, then row by row, so a segment below the top
+    level lies within its own cell and the ones after it on each axis."""
+    x0, y0, x1, y1 = (np.asarray(column, dtype=np.int64) for column in (x0, y0, x1, y1))
+    width, height = np.abs(x1 - x0), np.abs(y1 - y0)
+    with np.errstate(divide='ignore'):
+        level = np.clip(np.minimum(np.floor(np.log2(x_end / width)), np.floor(np.log2(y_end / height))), 0, levels).astype(np.int64)
+    #step down where rounding picked a level whose cells are too small; segments larger than an axis (e.g. running out of
+    #a plotted region) stay in the single top cell, which every query visits
+    level = np.maximum(level - (((width << level) > x_end) | ((height << level) > y_end)), 0)
+    cells = np.int64(1) << level
+    column = np.clip(np.minimum(x0, x1) * cells // x_end, 0, cells - 1)
+    row = np.clip(np.minimum(y0, y1) * cells // y_end, 0, cells - 1)
+    return (cells * cells - 1) // 3 + row * cells + column
+
+def grid_query(keys, levels, x_end, y_end, x_start, x_stop, y_start, y_stop):
+    """positions in sorted grid keys of every segment whose bounding box can overlap the rectangle, one key range per row of cells and level"""
+    lo, hi = [], []
+    for level in range(levels + 1):
+        cells = 1 << level
+        first_column, last_column = (int(np.clip(value * cells // x_end, 0, cells - 1)) for value in (x_start, x_stop))
+        first_row, last_row = (int(np.clip(value * cells // y_end, 0, cells - 1)) for value in (y_start, y_stop))
+        rows = (cells * cells - 1) // 3 + np.arange(max(first_row - 1, 0), last_row + 1, dtype=np.int64) * cells
+        lo.append(np.searchsorted(keys, rows + max(first_column - 1, 0), side='left'))
+        hi.append(np.searchsorted(keys, rows + last_column, side='right'))
+    lo, hi = np.concatenate(lo), np.concatenate(hi)
+    lengths = hi - lo
+    return np.repeat(lo - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+def segment_index(columns, x_end, y_end):
+    """grid index over dot plot segments, built once from their columns
+    
+    columns holds x0, y0, x1 and y1 in cumulative coordinates plus any other per-segment columns (e.g. identity), all of
+    which are reordered by grid key. The index adds the keys, 'order' (the input position of each row) and 'grid' (the
+    number of levels, the extent of each axis and the bounds of the segments). Segments may run outside 0 to x_end and
+    y_end, e.g. past a plotted region. segments_in_rectangle and nearest_segment return rows of the index."""
+    levels = grid_levels(len(columns['x0']))
+    keys = grid_keys(columns['x0'], columns['y0'], columns['x1'], columns['y1'], x_end, y_end, levels)
+    order = np.argsort(keys, kind='stable')
+    index = {name: np.asarray(values)[order] for name, values in columns.items()}
+    bounds = [0, 0, 0, 0]
+    if len(keys):
+        x = np.concatenate((index['x0'], index['x1']))
+        y = np.concatenate((index['y0'], index['y1']))
+        bounds = [x.min(), x.max(), y.min(), y.max()]
+    index.update({'key': keys[order], 'order': order, 'grid': np.array([levels, x_end, y_end, *bounds], dtype=np.int64)})
+    return index
+
+def segments_in_rectangle(index, x_start, x_stop, y_start, y_stop):
+    """rows of a segment index whose segments overlap the rectangle, reading only the candidate rows of the grid cells it covers"""
+    levels, x_end, y_end = (int(value) for value in index['grid'][:3])
+    candidates = grid_query(index['key'], levels, x_end, y_end, x_start, x_stop, y_start, y_stop)
+    x0, x1, y0, y1 = (index[name][candidates] for name in ('x0', 'x1', 'y0', 'y1'))
+    inside = (np.maximum(x0, x1) >= x_start) & (np.minimum(x0, x1) <= x_stop) & (np.maximum(y0, y1) >= y_start) & (np.minimum(y0, y1) <= y_stop)
+    return candidates[inside]
+
+def point_segment_distances(x0, y0, x1, y1, x, y, x_scale=1, y_scale=1):
+    """distance from the point x, y to each segment, after dividing each axis by its scale (e.g. bp per pixel)"""
+    x0, x1, x = (np.asarray(value, dtype=np.float64) / x_scale for value in (x0, x1, x))
+    y0, y1, y = (np.asarray(value, dtype=np.float64) / y_scale for value in (y0, y1, y))
+    dx, dy = x1 - x0, y1 - y0
+    squared = dx * dx + dy * dy
+    with np.errstate(invalid='ignore', divide='ignore'):
+        along = np.clip(np.where(squared > 0, ((x - x0) * dx + (y - y0) * dy) / squared, 0), 0, 1)
+    return np.hypot(x0 + along * dx - x, y0 + along * dy - y)
+
+def nearest_segment(index, x, y, x_scale=1, y_scale=1, max_distance=None):
+    """row of the segment nearest to the point x, y and its distance in scaled units, or None when none lies within max_distance
+    
+    The search box starts at the size of a cell of the finest grid level and doubles until it holds a segment; one more
+    query with the box as large as the nearest distance found so far makes the answer exact. The search gives up once
+    the box covers the bounds of every segment in the index."""
+    if not len(index['key']):
+        return None
+    levels, x_end, y_end, x_low, x_high, y_low, y_high = (int(value) for value in index['grid'])
+    radius = min(x_end / x_scale, y_end / y_scale) / (1 << levels)
+    if max_distance is not None:
+        radius = min(radius, max_distance)
+    while True:
+        rows = segments_in_rectangle(index, x - radius * x_scale, x + radius * x_scale, y - radius * y_scale, y + radius * y_scale)
+        grown = radius * 2
+        if len(rows):
+            distances = point_segment_distances(index['x0'][rows], index['y0'][rows], index['x1'][rows], index['y1'][rows], x, y, x_scale, y_scale)
+            nearest = int(np.argmin(distances))
+            if distances[nearest] <= radius:
+                return int(rows[nearest]), float(distances[nearest])
+            #a nearer segment outside the box must still overlap a box as large as this distance
+            grown = float(distances[nearest])
+        elif x - radius * x_scale <= x_low and x + radius * x_scale >= x_high and y - radius * y_scale <= y_low and y + radius * y_scale >= y_high:
+            return None
+        if max_distance is not None and radius >= max_distance:
+            return None
+        radius = grown if max_distance is None else min(grown, max_distance)
+
+def build_segment_store(entry, alignments, x_end, y_end):
+    """store the segment index of alignments as .npy files, with their identity range, renaming the finished entry into place"""
+    columns = {**alignment_segments(alignments), 'identity': alignments['identity'], 'query': alignments['query'], 'subject': alignments['subject']}
+    if 'members' in alignments:
+        columns['members'] = alignments['members']
+    index = segment_index(columns, x_end, y_end)
+    #rows are the stored alignments themselves, so their parse order is not kept
+    del index['order']
+    identity = alignments['identity']
+    index['identity_range'] = np.array([identity.min(), identity.max()] if len(identity) else [0, 100], dtype=np.float64)
+    write_npy_entry(entry, index)
+
+def read_segment_store(entry):
+    """memory-map the segment index of a store"""
+    return {file[:-len(".npy")]: np.load(os.path.join(entry, file), mmap_mode='r') for file in os.listdir(entry) if file.endswith(".npy")}
+
+def decimate_segments(x0, y0, x1, y1, x_start, x_stop, y_start, y_stop, width, height, limit):
+    """positions of the segments worth drawing on width x height pixels: the longest of those starting and ending on the same pixels, at most limit of them, longest first"""
+    x0, y0, x1, y1 = (np.asarray(column, dtype=np.float64) for column in (x0, y0, x1, y1))
+    #endpoints outside the view share the pixel just beyond its edge
+    pixel_x = lambda x: np.clip(np.floor((x - x_start) * (width / max(x_stop - x_start, 1e-9))), -1, width).astype(np.int64) + 1
+    pixel_y = lambda y: np.clip(np.floor((y - y_start) * (height / max(y_stop - y_start, 1e-9))), -1, height).astype(np.int64) + 1
+    key = ((pixel_x(x0) * (height + 2) + pixel_y(y0)) * (width + 2) + pixel_x(x1)) * (height + 2) + pixel_y(y1)
+    length = np.hypot(x1 - x0, y1 - y0)
+    order = np.lexsort((-length, key))
+    kept = order[np.concatenate(([True], key[order][1:] != key[order][:-1]))] if len(order) else order
+    if len(kept) > limit:
+        kept = kept[np.argpartition(-length[kept], limit - 1)[:limit]]
+    return np.sort(kept)
+
+def alignment_lists(alignments, x_cumulative_length_dict, y_cumulative_length_dict):
+    """convert alignment columns to the per-alignment lists returned by the parse functions"""
+    x_contigs = list(x_cumulative_length_dict)
+    y_contigs = list(y_cumulative_length_dict)
+    query_positions = list(zip(alignments['query_start'].tolist(), alignments['query_end'].tolist()))
+    subject_positions = list(zip(alignments['subject_start'].tolist(), alignments['subject_end'].tolist()))
+    identities = alignments['identity'].tolist()
+    strands = np.where(alignments['subject_end'] >= alignments['subject_start'], "+", "-").tolist()
+    queries = [x_contigs[code] for code in alignments['query'].tolist()]
+    subjects = [y_contigs[code] for code in alignments['subject'].tolist()]
     return query_positions, subject_positions, identities, strands, queries, subjects
 
-def parse_paf_file(paf_file, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict):    
+def parse_nucmer_coords_file(coords_file, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads=1):    
+    """parse nucmer (-T -l) coordinates file"""
+    alignments = load_nucmer_coords_columns(coords_file, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads)
+    return alignment_lists(alignments, x_cumulative_length_dict, y_cumulative_length_dict)
+
+def parse_paf_file(paf_file, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads=1):    
     """parse paf file"""
-    query_positions = []
-    subject_positions = []
-    identities = []
-    strands = []
-    queries = []
-    subjects = []
-    with open(paf_file, 'r') as f:
-        for line in f:
-            line = line.rstrip("\n")
-            fields = line.split("\t")
-            for i in range(0, len(fields)):
-                if "de" in fields[i]:
-                    identity = 100 - (float(fields[i].split(":")[2])*100)
-            if identity > float(threshold) and fields[0] in x_cumulative_length_dict.keys() and fields[5] in y_cumulative_length_dict.keys() and abs(int(fields[2]) - int(fields[3])) >= size_threshold:
-                current_query_id = fields[0]
-                queries.append(current_query_id)
-                current_subject_id = fields[5]
-                subjects.append(current_subject_id)
-                query_start = int(fields[2]) + int(x_cumulative_length_dict[current_query_id])
-                query_end = int(fields[3]) + int(x_cumulative_length_dict[current_query_id])
-                subject_start = int(fields[7]) + int(y_cumulative_length_dict[current_subject_id])
-                subject_end = int(fields[8]) + int(y_cumulative_length_dict[current_subject_id])
-                if subject_end > subject_start:    
-                    strand = "+"
-                elif subject_start > subject_end:
-                    strand = "-"
-                query_positions.append((query_start, query_end))
-                subject_positions.append((subject_start, subject_end))
-                identities.append(identity)
-                strands.append(strand)
-    return query_positions, subject_positions, identities, strands, queries, subjects
+    alignments = load_paf_columns(paf_file, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, threads)
+    return alignment_lists(alignments, x_cumulative_length_dict, y_cumulative_length_dict)
+
+def load_bed_columns(bed_file, cumulative_length_dict, extra_columns=None):
+    """load a bed file into numpy columns in one pass: contig codes, cumulative start/end and any extra columns (as bytes)"""
+    extra_columns = extra_columns or {}
+    contigs = contig_codes(cumulative_length_dict)
+    min_fields = max([3] + [column + 1 for column in extra_columns.values()])
+    chunks = []
+    with open_input(bed_file) as f:
+        for block in read_blocks(f):
+            buffer = np.frombuffer(block, dtype=np.uint8)
+            _, _, bounds = split_fields(buffer, (0, 1, 2) + tuple(extra_columns.values()), min_fields)
+            contig = encode_contigs(field_strings(buffer, *bounds[0]), contigs[0], contigs[1])
+            keep = contig >= 0
+            contig = contig[keep]
+            chunk = {
+                'contig': contig,
+                'start': field_integers(buffer, bounds[1][0][keep], bounds[1][1][keep]) + contigs[2][contig],
+                'end': field_integers(buffer, bounds[2][0][keep], bounds[2][1][keep]) + contigs[2][contig]
+                }
+            for name, column in extra_columns.items():
+                chunk[name] = field_strings(buffer, bounds[column][0][keep], bounds[column][1][keep])
+            chunks.append(chunk)
+    columns = {'contig': np.empty(0, dtype=np.int32), 'start': np.empty(0, dtype=np.int64), 'end': np.empty(0, dtype=np.int64)}
+    columns.update({name: np.empty(0, dtype=bytes) for name in extra_columns})
+    if chunks:
+        columns = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in columns}
+    #drop intervals outside the plotted extent, e.g. when plotting a region
+    inside = (columns['end'] > 0) & (columns['start'] < cumulative_length_dict["end"])
+    return {name: values[inside] for name, values in columns.items()}
 
 def track(bed_file, cumulative_length_dict):
     """prepare data for loading a quantitative track, like coverage"""
-    coordinates = []
-    track_values = []
-    contigs = []
-    window_size = []
-    with open(bed_file) as file:
-        for line in file:
-            line = line.rstrip("\n")
-            fields = line.split("\t")
-            if fields[0] in cumulative_length_dict.keys():
-                start = int(fields[1]) + int(cumulative_length_dict[fields[0]])
-                end = int(fields[2]) + int(cumulative_length_dict[fields[0]])
-                coordinate = (start + end) // 2  # Midpoint of the window
-                value = int(fields[3])
-                coordinates.append(coordinate)
-                track_values.append(value)
-                contigs.append(fields[0])
-                if len(window_size) < 1:
-                    window_size.append(int(end - start))
+    bed = load_bed_columns(bed_file, cumulative_length_dict, {'value': 3})
     track_data = {
-        'position': coordinates,
-        'value': track_values,
-        'sequence': contigs
+        'position': (bed['start'] + bed['end']) // 2,  # Midpoint of the window
+        'value': bed['value'].astype(np.int64),
+        'contig': bed['contig']  # Code of the sequence, named through the cumulative_length_dict order
     }
-    return track_data, window_size[0]
+    #a region can leave no windows, which then have no size to read
+    return track_data, int(bed['end'][0] - bed['start'][0]) if len(bed['start']) else 1
+
+def track_pyramid(position, value, contig, window_size, bins):
+    """min/mean/max summaries of a track at power-of-two multiples of its window size, coarsening until a level has at most bins bins, each bin named by the contig of its first window"""
+    order = np.argsort(position, kind='stable')
+    position = position[order]
+    contig = contig[order]
+    minimum = maximum = total = value[order]
+    count = np.ones(len(position), dtype=np.int64)
+    levels = []
+    bin_size = window_size
+    while len(position) > bins:
+        bin_size *= 2
+        #each level is reduced from the one below it
+        keys = position // bin_size
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        minimum = np.minimum.reduceat(minimum, starts)
+        maximum = np.maximum.reduceat(maximum, starts)
+        total = np.add.reduceat(total, starts)
+        count = np.add.reduceat(count, starts)
+        contig = contig[starts]
+        position = keys[starts] * bin_size + bin_size // 2
+        levels.append({'bin': bin_size, 'data': {'position': position, 'value': (total / count).astype(np.float32), 'minimum': minimum, 'maximum': maximum, 'contig': contig}})
+    return levels
+
+def track_levels(track_data, window_size, bins):
+    """the windows of a track followed by its track_pyramid levels, all as min/mean/max columns in position order"""
+    order = np.argsort(track_data['position'], kind='stable')
+    value = track_data['value'][order]
+    windows = {'bin': window_size, 'data': {'position': track_data['position'][order], 'value': value, 'minimum': value, 'maximum': value, 'contig': track_data['contig'][order]}}
+    return [windows] + track_pyramid(track_data['position'], track_data['value'], track_data['contig'], window_size, bins)
+
+def track_window(levels, start, end, pixels):
+    """bin size and columns of the finest track level with bins at least a pixel wide across start-end, cut to the bins in view"""
+    level = next((level for level in levels if (end - start) / level['bin'] <= pixels), levels[-1])
+    position = level['data']['position']
+    lo = int(np.searchsorted(position, start - level['bin'], side='left'))
+    hi = int(np.searchsorted(position, end + level['bin'], side='right'))
+    return level['bin'], {name: values[lo:hi] for name, values in level['data'].items()}
+
+def feature_index(bed):
+    """sorted interval index of feature bed columns, searchable like an annotation index"""
+    order = np.argsort(bed['start'], kind='stable')
+    lengths = bed['end'] - bed['start']
+    return {'start': bed['start'][order], 'end': bed['end'][order], 'strand': np.zeros(len(order), dtype=np.uint8), 'max_length': int(lengths.max()) if len(lengths) else 0}
 
 def annotation(bed_file, cumulative_length_dict):
-    """prepare data for loading an annotation track"""
-    start_positions = []
-    end_positions = []
-    contigs = []
-    names = []
-    strands = []
-    object_centres = []
-    object_y_coordinates = []
-    colors = []
-    with open(bed_file) as file:
-        for line in file:
-            line = line.rstrip("\n")
-            fields = line.split("\t")
-            if fields[0] in cumulative_length_dict.keys():
-                start = int(fields[1]) + int(cumulative_length_dict[fields[0]])
-                end = int(fields[2]) + int(cumulative_length_dict[fields[0]])
-                start_positions.append(start)
-                end_positions.append(end)
-                name = fields[3]
-                names.append(name)
-                strand = fields[5]
-                strands.append(strand)
-                contigs.append(fields[0])
-                object_centres.append([start, end])
-                object_y_coordinates.append([0,0])
-                if strand == '+':
-                    colors.append('#EFA647')
-                elif strand == '-':
-                    colors.append('#5A70A3')
-    # Create ColumnDataSource with all data
-    x_annotations_data={
-        'x': object_centres,
-        'y': object_y_coordinates,
-        'color': colors,
-        'name': names,
-        'start': start_positions,
-        'end': end_positions,
-        'strand': strands,
-        'location': contigs
-        }      
-    return x_annotations_data, start_positions, end_positions, strands
-
-def plot_interactive_bokeh(threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, plot_title, output_prefix, plot_width, plot_height, coords_file=None, paf_file=None, x_feature_bed_file=None, y_feature_bed_file=None, x_track_bed_file=None, x_track_title=None, x_track_feature_name=None, x_track_colour=None, y_track_bed_file=None, y_track_title=None, y_track_feature_name=None, y_track_colour=None, x_annotation_bed_file=None, y_annotation_bed_file=None, curation_mode=False):
-    
-    """Generate interactive html dotplot"""
+    """load an annotation track into a sorted interval index: feature columns in start order plus the longest feature length"""
+    bed = load_bed_columns(bed_file, cumulative_length_dict, {'name': 3, 'strand': 5})
+    order = np.argsort(bed['start'], kind='stable')
+    lengths = bed['end'] - bed['start']
+    return {
+        'start': bed['start'][order],
+        'end': bed['end'][order],
+        'strand': bed['strand'][order].astype('S1').view(np.uint8),
+        'contig': bed['contig'][order],
+        'name': bed['name'][order].astype(str).tolist(),
+        'max_length': int(lengths.max()) if len(lengths) else 0
+        }
+
+def annotation_window(index, start, end):
+    """positions lo to hi of an annotation index holding every feature that can overlap start-end"""
+    lo = int(np.searchsorted(index['start'], start - index['max_length'], side='left'))
+    hi = int(np.searchsorted(index['start'], end, side='right'))
+    return lo, hi
+
+def annotation_blocks(index, lo, hi, gap):
+    """merge features lo to hi of an annotation index into coverage blocks per strand, joining features at most gap bp apart"""
+    start, end = index['start'][lo:hi], index['end'][lo:hi]
+    plus = index['strand'][lo:hi] == ord("+")
+    blocks = {'start': [], 'end': [], 'strand': [], 'features': []}
+    for strand, members in (("+", plus), ("-", ~plus)):
+        member_start, member_end = start[members], end[members]
+        if not len(member_start):
+            continue
+        reach = np.maximum.accumulate(member_end)
+        firsts = np.flatnonzero(np.concatenate(([True], member_start[1:] > reach[:-1] + gap)))
+        blocks['start'].append(member_start[firsts])
+        blocks['end'].append(np.maximum.reduceat(member_end, firsts))
+        blocks['strand'].append(np.full(len(firsts), strand))
+        blocks['features'].append(np.diff(np.append(firsts, len(member_start))))
+    return {column: np.concatenate(parts) if parts else np.empty(0) for column, parts in blocks.items()}
+
+def annotation_pyramid(index, extent, pixels, limit=ANNOTATION_FEATURE_LIMIT):
+    """coverage blocks of a whole annotation index merged at power-of-two gaps, from the narrowest view holding more than limit features up to the full extent, each level in start order with its longest block"""
+    levels = []
+    if len(index['start']) <= limit:
+        return levels
+    #a view spanning less than this never has more than limit features to merge
+    narrowest = (index['start'][limit:] - index['start'][:-limit]).min() - index['max_length']
+    gap = 2 ** int(np.log2(max(narrowest / pixels, 1)))
+    while not levels or gap <= extent / pixels:
+        blocks = annotation_blocks(index, 0, len(index['start']), gap)
+        #a wider gap that merges nothing more repeats the level below
+        if not levels or len(blocks['start']) < len(levels[-1]['data']['start']):
+            order = np.argsort(blocks['start'], kind='stable')
+            lengths = blocks['end'] - blocks['start']
+            levels.append({'gap': gap, 'max_length': int(lengths.max()), 'data': {column: values[order] for column, values in blocks.items()}})
+        gap *= 2
+    return levels
+
+def block_window(levels, start, end, pixels):
+    """coverage blocks overlapping start-end from the widest annotation_pyramid level whose gap is at most a pixel"""
+    level = next((level for level in reversed(levels) if level['gap'] <= (end - start) / pixels), levels[0])
+    data = level['data']
+    lo = int(np.searchsorted(data['start'], start - level['max_length'], side='left'))
+    hi = int(np.searchsorted(data['start'], end, side='right'))
+    inside = (data['end'][lo:hi] > start) & (data['start'][lo:hi] < end)
+    return {column: values[lo:hi][inside] for column, values in data.items()}
+
+def annotation_glyphs(index, contigs, start, end, pixels, limit=ANNOTATION_FEATURE_LIMIT, levels=None):
+    """features overlapping start-end when at most limit are in view, otherwise coverage blocks merged to the width of a pixel, or taken from annotation_pyramid levels when given"""
+    lo, hi = annotation_window(index, start, end)
+    features = {'start': [], 'end': [], 'name': [], 'strand': [], 'location': [], 'color': []}
+    blocks = {'start': [], 'end': [], 'strand': [], 'features': [], 'color': []}
+    if hi - lo <= limit:
+        inside = np.arange(lo, hi)[(index['end'][lo:hi] > start) & (index['start'][lo:hi] < end)]
+        features = {
+            'start': index['start'][inside],
+            'end': index['end'][inside],
+            'name': [index['name'][i] for i in inside.tolist()],
+            'strand': [chr(code) if code else "" for code in index['strand'][inside].tolist()],
+            'location': [contigs[code] for code in index['contig'][inside].tolist()],
+            'color': np.where(index['strand'][inside] == ord("+"), '#EFA647', '#5A70A3').tolist()
+            }
+    else:
+        blocks = block_window(levels, start, end, pixels) if levels else annotation_blocks(index, lo, hi, (end - start) / pixels)
+        blocks['strand'] = blocks['strand'].tolist()
+        blocks['color'] = np.where(np.array(blocks['strand']) == "+", '#EFA647', '#5A70A3').tolist()
+    return features, blocks
+
+def timed(loader):
+    """run a loader, returning its result and the time it took"""
+    start = time.perf_counter()
+    result = loader()
+    return result, time.perf_counter() - start
+
+def load_concurrently(loaders):
+    """run independent input loaders on a thread pool, logging how long each input took as it finishes"""
+    results = {}
+    with ThreadPoolExecutor(max(len(loaders), 1)) as pool:
+        futures = {pool.submit(timed, loader): name for name, loader in loaders.items()}
+        for future in as_completed(futures):
+            results[futures[future]], seconds = future.result()
+            print(f"Loaded {futures[future]} in {seconds:.2f} s")
+    return results
+
+def input_loaders(threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, coords_file=None, paf_file=None, delta_file=None, threads=1, cache_dir=None, cache_size=CACHE_SIZE, x_region=None, y_region=None, x_feature_bed_file=None, y_feature_bed_file=None, x_track_bed_file=None, y_track_bed_file=None, x_annotation_bed_file=None, y_annotation_bed_file=None, with_alignments=True):
+    """loaders for load_concurrently of the alignments and each given bed file, named as the plots look the inputs up"""
+    loaders = {}
+    if with_alignments:
+        loaders["alignments"] = partial(load_alignments, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, coords_file=coords_file, paf_file=paf_file, delta_file=delta_file, threads=threads, cache_dir=cache_dir, cache_size=cache_size, x_region=x_region, y_region=y_region)
+    if x_feature_bed_file:
+        loaders["x feature bed file"] = partial(load_bed_columns, x_feature_bed_file, x_cumulative_length_dict)
+    if y_feature_bed_file:
+        loaders["y feature bed file"] = partial(load_bed_columns, y_feature_bed_file, y_cumulative_length_dict)
+    if x_track_bed_file:
+        loaders["x track bed file"] = partial(track, x_track_bed_file, x_cumulative_length_dict)
+    if y_track_bed_file:
+        loaders["y track bed file"] = partial(track, y_track_bed_file, y_cumulative_length_dict)
+    if x_annotation_bed_file:
+        loaders["x annotation bed file"] = partial(annotation, x_annotation_bed_file, x_cumulative_length_dict)
+    if y_annotation_bed_file:
+        loaders["y annotation bed file"] = partial(annotation, y_annotation_bed_file, y_cumulative_length_dict)
+    return loaders
+
+def boundary_sources(x_cumulative_length_dict, y_cumulative_length_dict):
+    """contig boundary positions of each axis as bokeh sources, shared by all panels of that axis"""
+    from bokeh.models import ColumnDataSource
+    return {axis: ColumnDataSource(data={'position': np.fromiter(cumulative_length_dict.values(), dtype=np.int64, count=len(cumulative_length_dict))})
+            for axis, cumulative_length_dict in (("x", x_cumulative_length_dict), ("y", y_cumulative_length_dict))}
+
+def plot_boundaries(panel, axis, sources):
+    """draw the contig boundaries of an axis on a panel as one span glyph"""
+    if axis == "x":
+        return panel.vspan(x='position', source=sources["x"], line_color='grey', line_width=0.5)
+    elif axis == "y":
+        return panel.hspan(y='position', source=sources["y"], line_color='grey', line_width=0.5)
+
+def contig_hover(names):
+    """hover formatter showing the name of a contig code from a names table sent once"""
+    from bokeh.models import CustomJSHover
+    return CustomJSHover(args=dict(names=names), code="return names[value];")
+
+def track_panel(levels, axis, shared_range, pixels, extent, title, feature_name, colour, names, output_backend, boundaries, embed=True):
+    """panel of the track_levels of a track, sharing shared_range with the dot plot and pixels long along it
+
+    Embedded, every level goes to the browser and the finest with bins at least a pixel wide is shown after each range update.
+    Otherwise the panel draws one empty source, returned with it, for the caller to fill with track_window."""
+    from bokeh.plotting import figure
+    from bokeh.models import HoverTool, ColumnDataSource, NumeralTickFormatter, CustomJS
+    from bokeh.events import RangesUpdate
+    values = levels[0]['data']['value']
+    maximum = max(int(values.max()), 2) if len(values) else 2
+    if axis == "x":
+        panel = figure(title=title, y_axis_label=feature_name, width=pixels, height=150, x_range=shared_range, min_border_left=100, tools="pan", y_axis_type="log", y_range=[1, maximum])
+    elif axis == "y":
+        panel = figure(title=title, x_axis_label=feature_name, height=pixels, width=200, y_range=shared_range, tools="pan", x_axis_type="log", x_range=[1, maximum])
+    panel.output_backend = output_backend
+
+    def bar(top, width, source, **style):
+        if axis == "x":
+            return panel.vbar(x='position', top=top, width=width, source=source, bottom=1e-10, **style)
+        elif axis == "y":
+            return panel.hbar(y='position', right=top, height=width, source=source, left=1e-10, **style)
+
+    summary_tooltips = [("Sequence", "@contig{custom}"), ("Position", "@position"), (f"{feature_name} (mean)", "@value{0,0.0}"), ("Minimum", "@minimum"), ("Maximum", "@maximum")]
+    source = None
+    if embed:
+        # The windows are drawn as they are, each coarser level as its min/mean/max, and only one level is visible at a time
+        windows = ColumnDataSource(data={column: levels[0]['data'][column] for column in ('position', 'value', 'contig')})
+        groups = [[bar('value', levels[0]['bin'], windows, line_color=colour, fill_color=colour)]]
+        panel.add_tools(HoverTool(renderers=groups[0], tooltips=[("Sequence", "@contig{custom}"), ("Position", "@position"), (feature_name, "@value")], formatters={'@contig': contig_hover(names)}))
+        for level in levels[1:]:
+            level_source = ColumnDataSource(data=level['data'])
+            groups.append([bar('maximum', level['bin'], level_source, line_alpha=0, fill_color=colour, fill_alpha=0.35), bar('value', level['bin'], level_source, line_alpha=0, fill_color=colour)])
+        if len(groups) > 1:
+            panel.add_tools(HoverTool(renderers=[group[1] for group in groups[1:]], tooltips=summary_tooltips, formatters={'@contig': contig_hover(names)}))
+
+            # Pick the finest level whose bins are at least a pixel wide in the current view
+            bin_sizes = [level['bin'] for level in levels]
+            visible_level = next((i for i, bin_size in enumerate(bin_sizes) if extent / bin_size <= pixels), len(bin_sizes) - 1)
+            for i, group in enumerate(groups):
+                for renderer in group:
+                    renderer.visible = i == visible_level
+            level_callback = CustomJS(args=dict(track_range=shared_range, groups=groups, bin_sizes=bin_sizes, pixels=pixels), code="""
+        const span = track_range.end - track_range.start;
+        let level = bin_sizes.findIndex((bin_size) => span / bin_size <= pixels);
+        if (level === -1) {
+            level = groups.length - 1;
+        }
+        groups.forEach((group, i) => group.forEach((renderer) => renderer.visible = i === level));
+    """)
+            # Bokeh emits one RangesUpdate per pan or zoom on every plot linked to the changed ranges, this panel included
+            panel.js_on_event(RangesUpdate, level_callback)
+    else:
+        source = ColumnDataSource(data={'position': [], 'value': [], 'minimum': [], 'maximum': [], 'contig': [], 'bin': []})
+        bar('maximum', 'bin', source, line_alpha=0, fill_color=colour, fill_alpha=0.35)
+        panel.add_tools(HoverTool(renderers=[bar('value', 'bin', source, line_alpha=0, fill_color=colour)], tooltips=summary_tooltips, formatters={'@contig': contig_hover(names)}))
+
+    # Only the value axis is labelled, the position axis is the dot plot's
+    if axis == "x":
+        panel.xaxis.formatter = NumeralTickFormatter(format="0")
+        panel.yaxis.formatter = NumeralTickFormatter(format="0,0")
+        panel.xaxis.major_tick_line_color = None
+        panel.xaxis.major_label_text_font_size = '0pt'
+        panel.xgrid.visible = False
+        panel.ygrid.visible = True
+        panel.ygrid.grid_line_dash = [4, 4]
+    elif axis == "y":
+        panel.xaxis.formatter = NumeralTickFormatter(format="0,0")
+        panel.yaxis.formatter = NumeralTickFormatter(format="0")
+        panel.yaxis.major_tick_line_color = None
+        panel.yaxis.major_label_text_font_size = '0pt'
+        panel.xaxis.major_label_text_font_size = '6pt'
+        panel.xgrid.visible = True
+        panel.ygrid.visible = False
+        panel.xgrid.grid_line_dash = [4, 4]
+    plot_boundaries(panel, axis, boundaries)
+    panel.toolbar.autohide = True
+    return panel, source
+
+def annotation_panel(index, levels, axis, shared_range, pixels, extent, names, output_backend, boundaries, embed=True):
+    """panel of an annotation index and its annotation_pyramid levels, drawn as individual features or, when too many are in view, merged blocks
+
+    Embedded, the packed index and block levels go to the browser once and the glyphs are sliced from them after each range update.
+    Otherwise the caller refills the returned feature and block sources with annotation_glyphs."""
+    from bokeh.plotting import figure
+    from bokeh.models import HoverTool, ColumnDataSource, CustomJS, Range1d
+    from bokeh.events import RangesUpdate
+    if axis == "x":
+        panel = figure(title="Annotation Track", width=pixels, height=100, x_range=shared_range, min_border_left=100, tools="pan", y_range=Range1d(-0.5, 0.5))
+    elif axis == "y":
+        panel = figure(title="Annotation Track", height=pixels, width=150, y_range=shared_range, tools="pan", x_range=Range1d(-0.5, 0.5))
+    panel.output_backend = output_backend
+    features, blocks = annotation_glyphs(index, names, 0, extent, pixels, levels=levels)
+    feature_source = ColumnDataSource(data=features)
+    block_source = ColumnDataSource(data=blocks)
+    if axis == "x":
+        feature_lines = panel.segment(x0='start', y0=0, x1='end', y1=0, color='color', source=feature_source, line_width=25)
+        block_lines = panel.segment(x0='start', y0=0, x1='end', y1=0, color='color', source=block_source, line_width=25)
+    elif axis == "y":
+        feature_lines = panel.segment(x0=0, y0='start', x1=0, y1='end', color='color', source=feature_source, line_width=25)
+        block_lines = panel.segment(x0=0, y0='start', x1=0, y1='end', color='color', source=block_source, line_width=25)
+    panel.add_tools(HoverTool(renderers=[feature_lines], tooltips=[("Name", "@name"), ("Start Position", "@start"), ("End Position", "@end"), ("Strand", "@strand"), ("Location", "@location")]))
+    panel.add_tools(HoverTool(renderers=[block_lines], tooltips=[("Features", "@features"), ("Start Position", "@start"), ("End Position", "@end"), ("Strand", "@strand")]))
+
+    if embed:
+        # Names travel as one utf-8 buffer with the end offset of each, decoded only for the features drawn
+        encoded = [name.encode() for name in index['name']]
+        index_source = ColumnDataSource(data={**{column: index[column] for column in ('start', 'end', 'strand', 'contig')}, 'name_end': np.cumsum([len(name) for name in encoded], dtype=np.int64)})
+        name_source = ColumnDataSource(data={'bytes': np.frombuffer(b"".join(encoded), dtype=np.uint8)})
+        level_data = [{**level['data'], 'strand': np.where(level['data']['strand'] == "+", ord("+"), ord("-")).astype(np.uint8)} for level in levels]
+        level_source = ColumnDataSource(data={column: np.concatenate([data[column] for data in level_data]) for column in ('start', 'end', 'strand', 'features')} if levels else {'start': [], 'end': [], 'strand': [], 'features': []})
+        annotation_callback = CustomJS(args=dict(index=index_source, names=name_source, blocks_by_level=level_source, gaps=[level['gap'] for level in levels], offsets=np.cumsum([0] + [len(level['data']['start']) for level in levels]).tolist(), block_lengths=[level['max_length'] for level in levels], contigs=names, max_length=index['max_length'], limit=ANNOTATION_FEATURE_LIMIT, pixels=pixels, annotation_range=shared_range, feature_source=feature_source, block_source=block_source), code="""
+        const {start, end, strand, contig, name_end} = index.data;
+        const [view_start, view_end] = [annotation_range.start, annotation_range.end];
+        const bound = (values, target, upper, lo, hi) => {
+            while (lo < hi) {
+                const middle = (lo + hi) >>> 1;
+                if (values[middle] < target || (upper && values[middle] === target)) {
+                    lo = middle + 1;
+                } else {
+                    hi = middle;
+                }
+            }
+            return lo;
+        };
+        const color = (plus) => plus ? '#EFA647' : '#5A70A3';
+        const lo = bound(start, view_start - max_length, false, 0, start.length);
+        const hi = bound(start, view_end, true, 0, start.length);
+        const features = {start: [], end: [], name: [], strand: [], location: [], color: []};
+        const blocks = {start: [], end: [], strand: [], features: [], color: []};
+        if (hi - lo <= limit) {
+            const decoder = new TextDecoder();
+            for (let i = lo; i < hi; i++) {
+                if (end[i] > view_start && start[i] < view_end) {
+                    features.start.push(start[i]);
+                    features.end.push(end[i]);
+                    features.name.push(decoder.decode(names.data.bytes.subarray(i ? name_end[i - 1] : 0, name_end[i])));
+                    features.strand.push(strand[i] ? String.fromCharCode(strand[i]) : "");
+                    features.location.push(contigs[contig[i]]);
+                    features.color.push(color(strand[i] === 43));
+                }
+            }
+        } else {
+            // Slice the blocks in view from the widest level whose gap is at most a pixel
+            const gap = (view_end - view_start) / pixels;
+            let level = gaps.length - 1;
+            while (level > 0 && gaps[level] > gap) {
+                level--;
+            }
+            const data = blocks_by_level.data;
+            const first = bound(data.start, view_start - block_lengths[level], false, offsets[level], offsets[level + 1]);
+            const last = bound(data.start, view_end, true, offsets[level], offsets[level + 1]);
+            for (let i = first; i < last; i++) {
+                if (data.end[i] > view_start && data.start[i] < view_end) {
+                    blocks.start.push(data.start[i]);
+                    blocks.end.push(data.end[i]);
+                    blocks.strand.push(String.fromCharCode(data.strand[i]));
+                    blocks.features.push(data.features[i]);
+                    blocks.color.push(color(data.strand[i] === 43));
+                }
+            }
+        }
+        feature_source.data = features;
+        block_source.data = blocks;
+    """)
+        # Bokeh emits one RangesUpdate per pan or zoom on every plot linked to the changed ranges, this panel included
+        panel.js_on_event(RangesUpdate, annotation_callback)
+
+    #only the dot plot's axes carry ticks
+    panel.xaxis.major_tick_line_color = None
+    panel.xaxis.major_label_text_font_size = '0pt'
+    panel.yaxis.major_tick_line_color = None
+    panel.yaxis.major_label_text_font_size = '0pt'
+    if axis == "x":
+        panel.xgrid.visible = False
+        panel.ygrid.visible = True
+        panel.ygrid.grid_line_dash = [4, 4]
+    elif axis == "y":
+        panel.xgrid.visible = True
+        panel.ygrid.visible = False
+        panel.xgrid.grid_line_dash = [4, 4]
+    plot_boundaries(panel, axis, boundaries)
+    panel.toolbar.autohide = True
+    return panel, (feature_source, block_source)
+
+def identity_colormap():
+    """orange to red to black matplotlib colormap used for nucleotide identity"""
+    from matplotlib.colors import LinearSegmentedColormap
+    return LinearSegmentedColormap.from_list("blended_cmap", IDENTITY_COLORS)
+
+def identity_palette(size=256):
+    """hex colours of the identity colormap, interpolated exactly like matplotlib's lookup table so the html does not need matplotlib"""
+    markers = np.array([marker for marker, _ in IDENTITY_COLORS]) * (size - 1)
+    anchors = np.array([[int(color[i:i + 2], 16) / 255 for i in (1, 3, 5)] for _, color in IDENTITY_COLORS])
+    positions = (size - 1) * np.linspace(0, 1, size)
+    segment = np.searchsorted(markers, positions)[1:-1]
+    distance = (positions[1:-1] - markers[segment - 1]) / (markers[segment] - markers[segment - 1])
+    table = np.concatenate([anchors[:1], distance[:, None] * (anchors[segment] - anchors[segment - 1]) + anchors[segment - 1], anchors[-1:]])
+    return [f"#{int(r*255):02x}{int(g*255):02x}{int(b*255):02x}" for r, g, b in np.clip(table, 0, 1)]
+
+def render_static(filenames, segments, identities, x_cumulative_length_dict, y_cumulative_length_dict, plot_title, plot_width, plot_height, overview=None, x_features=None, y_features=None, x_track=None, y_track=None, x_annotations=None, y_annotations=None, feature_color='green'):
+    """draw the static plot (dot plot, colour bar, tracks, annotation panels and contig boundaries) with matplotlib and save it to each filename
     
-    import holoviews as hv
-    from bokeh.plotting import figure, show, save
-    from bokeh.models import HoverTool, FixedTicker, Label, ColumnDataSource, Span, NumeralTickFormatter, TapTool, CustomJS, Button, BoxAnnotation, Div, Select, Range1d, WheelZoomTool, CrosshairTool, LinearColorMapper, ColorBar
-    from bokeh.layouts import column, row
-    from matplotlib.colors import Normalize, LinearSegmentedColormap
+    Tracks are (track data, window size, title, feature name, colour) tuples as built for the interactive plot and annotations are annotation indexes.
+    An overview image, if given, is drawn in place of the alignment segments, so it should only be given for raster files.
+    Sizes are in pixels at 100 dpi, like the bokeh layout; pngs are written at three times that resolution."""
+    import matplotlib
+    matplotlib.use("Agg")
     import matplotlib.pyplot as plt
-    from bokeh.transform import linear_cmap
-    from bokeh.io import output_file, export_png, export_svg
+    from matplotlib.collections import LineCollection, PolyCollection
+    from matplotlib.ticker import FuncFormatter
+
+    dpi = 100
+    points = 72 / dpi
+    x_end, y_end = x_cumulative_length_dict["end"], y_cumulative_length_dict["end"]
+    cmap = identity_colormap()
+    norm = matplotlib.colors.Normalize(vmin=identities.min(), vmax=identities.max()) if len(identities) else None
+    thousands = FuncFormatter(lambda value, position: f"{value:,.0f}")
+
+    # Same arrangement as the bokeh layout: x track and annotation panels above, y ones to the right
+    heights = [150] * bool(x_track) + [100] * bool(x_annotations) + [plot_height, 90]
+    widths = [plot_width] + [150] * bool(y_annotations) + [200] * bool(y_track)
+    figure_width, figure_height = sum(widths) + 180, sum(heights) + 100
+    figure = plt.figure(figsize=(figure_width / dpi, figure_height / dpi), dpi=dpi)
+    grid = figure.add_gridspec(len(heights), len(widths), height_ratios=heights, width_ratios=widths, left=130 / figure_width, right=1 - 50 / figure_width, top=1 - 80 / figure_height, bottom=20 / figure_height, hspace=0.05, wspace=0.05)
+    figure.suptitle(plot_title, fontsize=20, fontweight='bold')
+    main_row = len(heights) - 2
+
+    def boundaries(axes, axis):
+        if axis == "x":
+            axes.vlines(list(x_cumulative_length_dict.values()), 0, 1, transform=axes.get_xaxis_transform(), colors='grey', linewidth=0.5 * points)
+        elif axis == "y":
+            axes.hlines(list(y_cumulative_length_dict.values()), 0, 1, transform=axes.get_yaxis_transform(), colors='grey', linewidth=0.5 * points)
+
+    def strips(axes, bed, axis):
+        if axis == "x":
+            vertices = [[(start, 0), (end, 0), (end, 1), (start, 1)] for start, end in zip(bed['start'].tolist(), bed['end'].tolist())]
+            axes.add_collection(PolyCollection(vertices, transform=axes.get_xaxis_transform(), facecolors=feature_color, alpha=0.3, edgecolors='none'))
+        elif axis == "y":
+            vertices = [[(0, start), (1, start), (1, end), (0, end)] for start, end in zip(bed['start'].tolist(), bed['end'].tolist())]
+            axes.add_collection(PolyCollection(vertices, transform=axes.get_yaxis_transform(), facecolors=feature_color, alpha=0.3, edgecolors='none'))
+
+    # Dot plot
+    dot_plot = figure.add_subplot(grid[main_row, 0])
+    if overview is not None:
+        dot_plot.imshow(np.ma.masked_equal(overview, 0), cmap=cmap, vmin=1, vmax=255, origin='lower', extent=(0, x_end, 0, y_end), aspect='auto', interpolation='nearest')
+    elif len(identities):
+        lines = np.stack((np.column_stack((segments['x0'], segments['y0'])), np.column_stack((segments['x1'], segments['y1']))), axis=1)
+        dot_plot.add_collection(LineCollection(lines, colors=cmap(norm(identities.astype(np.float64))), linewidths=points))
+    dot_plot.set_xlim(0, x_end)
+    dot_plot.set_ylim(0, y_end)
+    boundaries(dot_plot, "x")
+    boundaries(dot_plot, "y")
+    if x_features is not None:
+        strips(dot_plot, x_features, "x")
+    if y_features is not None:
+        strips(dot_plot, y_features, "y")
+    dot_plot.set_xlabel('Position (bp)')
+    dot_plot.set_ylabel('Position (bp)')
+    dot_plot.xaxis.set_major_formatter(thousands)
+    dot_plot.yaxis.set_major_formatter(thousands)
+
+    # Colour bar
+    colour_bar = figure.add_subplot(grid[main_row + 1, 0])
+    colour_bar.axis('off')
+    if norm is not None:
+        bar_axes = colour_bar.inset_axes([0.1, 0.45, 0.8, 0.2])
+        figure.colorbar(matplotlib.cm.ScalarMappable(norm=norm, cmap=cmap), cax=bar_axes, orientation='horizontal').set_label("Nucleotide Identity (%)")
+
+    def track_bars(axes, track, axis, pixels):
+        track_data, window_size, title, feature_name, colour = track
+        levels = track_pyramid(track_data['position'], track_data['value'], track_data['contig'], window_size, pixels)
+        def bar(position, value, width, color, alpha=1):
+            # one collection per set of bars rather than a patch per bar
+            low, high = position - width / 2, position + width / 2
+            base = np.ones(len(position))
+            value = np.maximum(value, 1)
+            vertices = np.stack([np.column_stack(corner) for corner in ((low, base), (high, base), (high, value), (low, value))], axis=1)
+            if axis == "y":
+                vertices = vertices[:, :, ::-1]
+            axes.add_collection(PolyCollection(vertices, facecolors=color, alpha=alpha, edgecolors='none'))
+        if levels:
+            level = levels[-1]
+            bar(level['data']['position'], level['data']['maximum'], level['bin'], colour, alpha=0.35)
+            bar(level['data']['position'], level['data']['value'], level['bin'], colour)
+        else:
+            bar(track_data['position'], track_data['value'], window_size, colour)
+        maximum = max(int(track_data['value'].max()), 2) if len(track_data['value']) else 2
+        if axis == "x":
+            axes.set_yscale('log')
+            axes.set_ylim(1, maximum)
+            axes.set_ylabel(feature_name)
+            axes.yaxis.set_major_formatter(thousands)
+            axes.grid(axis='y', linestyle=(0, (4, 4)))
+        else:
+            axes.set_xscale('log')
+            axes.set_xlim(1, maximum)
+            axes.set_xlabel(feature_name)
+            axes.xaxis.set_major_formatter(thousands)
+            axes.tick_params(axis='x', labelsize=6)
+            axes.grid(axis='x', linestyle=(0, (4, 4)))
+        axes.set_title(title, fontsize=10, loc='left')
+        boundaries(axes, axis)
+
+    def annotation_lines(axes, index, axis, pixels):
+        cumulative_length_dict = x_cumulative_length_dict if axis == "x" else y_cumulative_length_dict
+        features, blocks = annotation_glyphs(index, list(cumulative_length_dict), 0, cumulative_length_dict["end"], pixels)
+        for glyphs in (features, blocks):
+            if len(glyphs['start']):
+                start, end = np.asarray(glyphs['start']), np.asarray(glyphs['end'])
+                zero = np.zeros(len(start))
+                ends = (np.column_stack((start, zero)), np.column_stack((end, zero))) if axis == "x" else (np.column_stack((zero, start)), np.column_stack((zero, end)))
+                axes.add_collection(LineCollection(np.stack(ends, axis=1), colors=glyphs['color'], linewidths=25 * points))
+        axes.set_title("Annotation Track", fontsize=10, loc='left')
+        axes.tick_params(labelbottom=False, labelleft=False, bottom=False, left=False)
+        boundaries(axes, axis)
+
+    row = 0
+    if x_track:
+        track_axes = figure.add_subplot(grid[row, 0], sharex=dot_plot)
+        track_bars(track_axes, x_track, "x", plot_width)
+        track_axes.tick_params(axis='x', labelbottom=False, length=0)
+        row += 1
+    if x_annotations:
+        annotation_axes = figure.add_subplot(grid[row, 0], sharex=dot_plot)
+        annotation_lines(annotation_axes, x_annotations, "x", plot_width)
+        annotation_axes.set_ylim(-0.5, 0.5)
+    column = 1
+    if y_annotations:
+        annotation_axes = figure.add_subplot(grid[main_row, column], sharey=dot_plot)
+        annotation_lines(annotation_axes, y_annotations, "y", plot_height)
+        annotation_axes.set_xlim(-0.5, 0.5)
+        column += 1
+    if y_track:
+        track_axes = figure.add_subplot(grid[main_row, column], sharey=dot_plot)
+        track_bars(track_axes, y_track, "y", plot_height)
+        track_axes.tick_params(axis='y', labelleft=False, length=0)
+
+    for filename in filenames:
+        figure.savefig(filename, dpi=3 * dpi if filename.endswith(".png") else dpi)
+    plt.close(figure)
+
+def plot_interactive_bokeh(threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, plot_title, output_prefix, plot_width, plot_height, coords_file=None, paf_file=None, delta_file=None, x_feature_bed_file=None, y_feature_bed_file=None, x_track_bed_file=None, x_track_title=None, x_track_feature_name=None, x_track_colour=None, y_track_bed_file=None, y_track_title=None, y_track_feature_name=None, y_track_colour=None, x_annotation_bed_file=None, y_annotation_bed_file=None, curation_mode=False, threads=1, cache_dir=None, cache_size=CACHE_SIZE, x_region=None, y_region=None, output_backend="webgl", chain_gap=None, max_alignments=None, overview_threshold=OVERVIEW_THRESHOLD, overview_levels=OVERVIEW_LEVELS, outputs=OUTPUTS, loaded=None):
     
-    if coords_file:
-        query_positions, subject_positions, identities, strands, queries, subjects = parse_nucmer_coords_file(coords_file, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict)
-    if paf_file:
-        query_positions, subject_positions, identities, strands, queries, subjects = parse_paf_file(paf_file, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict)
+    """Generate interactive html dotplot; inputs already parsed by the caller (e.g. a batch run) can be passed in loaded, keyed like the loaders below, and are not read again"""
     
-    hv.extension('bokeh')
+    from bokeh.plotting import figure, save
+    from bokeh.models import HoverTool, ColumnDataSource, NumeralTickFormatter, TapTool, CustomJS, Button, Div, Select, Range1d, WheelZoomTool, LinearColorMapper, ColorBar, CustomJSHover
+    from bokeh.layouts import column, row
+    from bokeh.transform import transform
+    from bokeh.events import RangesUpdate
+    from bokeh.io import output_file
     
+    # Load the alignment and all bed files at the same time
+    loaders = input_loaders(threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, coords_file=coords_file, paf_file=paf_file, delta_file=delta_file, threads=threads, cache_dir=cache_dir, cache_size=cache_size, x_region=x_region, y_region=y_region, x_feature_bed_file=x_feature_bed_file, y_feature_bed_file=y_feature_bed_file, x_track_bed_file=x_track_bed_file, y_track_bed_file=y_track_bed_file, x_annotation_bed_file=x_annotation_bed_file, y_annotation_bed_file=y_annotation_bed_file)
+    loaded = loaded or {}
+    inputs = {**loaded, **load_concurrently({name: loader for name, loader in loaders.items() if name not in loaded})}
+
+    alignments = inputs["alignments"]
+    if chain_gap is not None:
+        alignments = chain_alignments(alignments, chain_gap)
+    if max_alignments is not None:
+        alignments, dropped = limit_alignments(alignments, max_alignments)
+        x_contigs, y_contigs = list(x_cumulative_length_dict), list(y_cumulative_length_dict)
+        for (query, subject), count in sorted(dropped.items(), key=lambda item: item[1], reverse=True):
+            print(f"Dropped {count} alignments between {x_contigs[query]} and {y_contigs[subject]}")
+    identities = alignments['identity']
+
     # Create the Bokeh figure
     p = figure(width=plot_width, height=plot_height, min_border_left=100, x_axis_label='Position (bp)', y_axis_label='Position (bp)', tools="pan, reset, box_zoom, wheel_zoom, crosshair")
     p.toolbar.active_scroll = p.select_one(WheelZoomTool)  # Enable wheel zoom as the active scroll tool
-    p.output_backend="svg"
-    # Define color palette and normalization
-    colors = ['orange', 'red', 'black']
-    markers = [0, 0.5, 1]
-    norm = plt.Normalize(vmin=min(identities), vmax=max(identities))
-    blended_cmap = LinearSegmentedColormap.from_list("blended_cmap", list(zip(markers, colors)))
+    p.output_backend=output_backend
+    # Define color palette
+    cmap_hex = identity_palette()
 
-    # Convert the Matplotlib colormap to a list of hex colors
-    cmap_hex = [f"#{int(r*255):02x}{int(g*255):02x}{int(b*255):02x}" for r, g, b, a in blended_cmap(range(blended_cmap.N))]
+    # Show only the selected regions, which start at zero
+    if x_region:
+        p.x_range = Range1d(0, x_cumulative_length_dict["end"])
+    if y_region:
+        p.y_range = Range1d(0, y_cumulative_length_dict["end"])
 
     # Remove grid lines
     p.xgrid.visible = False
     p.ygrid.visible = False
 
+    # Contig boundaries are one span glyph per axis and panel, all panels of an axis sharing one source
+    boundaries = boundary_sources(x_cumulative_length_dict, y_cumulative_length_dict)
+
     # Add vertical and horizontal lines for contig boundaries
-    for x_position in x_cumulative_length_dict.values():
-        vline = Span(location=x_position, dimension='height', line_color='grey', line_width=0.5)
-        p.add_layout(vline)
-    for y_position in y_cumulative_length_dict.values():
-        hline = Span(location=y_position, dimension='width', line_color='grey', line_width=0.5)
-        p.add_layout(hline)
-
-    # Prepare data for plotting
-    x = []
-    y = []
-    colors = []
-    query_contigs = []
-    subject_contigs = []
-    
-    for (q_start, q_end), (s_start, s_end), identity, strand, query, subject in zip(query_positions, subject_positions, identities, strands, queries, subjects):
-        x.append([q_start, q_end])
-        if strand == "+":
-            y.append([s_start, s_end])
-        elif strand == "-":
-            y.append([s_start, s_start + (q_start - q_end)])
-        
-        # Map identity values to colors using the custom color map
-        color = blended_cmap(norm(identity))
-        hex_color = "#{:02X}{:02X}{:02X}".format(int(color[0] * 255), int(color[1] * 255), int(color[2] * 255))
-        colors.append(hex_color)
+    plot_boundaries(p, "x", boundaries)
+    plot_boundaries(p, "y", boundaries)
+
+    # Prepare data for plotting straight from the alignment columns as flat typed
+    # arrays, which bokeh embeds as base64 buffers rather than nested JSON lists
+    coordinate_type = np.int32 if max(x_cumulative_length_dict["end"], y_cumulative_length_dict["end"]) < 2**31 else np.float64
+    segments = {name: values.astype(coordinate_type) for name, values in alignment_segments(alignments).items()}
 
-        query_contigs.append(query)
-        subject_contigs.append(subject)
+    # Contig names travel once as lookup tables, each alignment only carries their codes
+    x_names = list(x_cumulative_length_dict)
+    y_names = list(y_cumulative_length_dict)
+    query_codes = alignments['query'].astype(np.min_scalar_type(len(x_names)))
+    subject_codes = alignments['subject'].astype(np.min_scalar_type(len(y_names)))
 
-    # Create a LinearColorMapper for the color bar and line coloring
-    mapper = LinearColorMapper(palette=cmap_hex, low=min(identities), high=max(identities))
+    # Create a LinearColorMapper for the color bar and line coloring; the
+    # browser looks each identity up in the palette, so no colour column is stored
+    # A region without alignments still gets a colour bar, over the full identity range
+    mapper = LinearColorMapper(palette=cmap_hex, low=identities.min() if len(identities) else 0, high=identities.max() if len(identities) else 100)
 
     # Create a ColumnDataSource for the plot
-    source = ColumnDataSource(data={'x': x, 'y': y, 'colors': colors, 'query': query_contigs, 'subject': subject_contigs, 'identity': identities})
+    source = ColumnDataSource(data={**segments, 'query': query_codes, 'subject': subject_codes, 'identity': identities})
+    if 'members' in alignments:
+        source.data['members'] = alignments['members']
     
-    # Add multi-line plot to the figure
-    multi_line = p.multi_line('x', 'y', color='colors', source=source, line_width=1)
-
-    # Add the HoverTool to the plot
-    hover_lines = HoverTool(renderers=[multi_line], tooltips=[("x", "@query"), ("y", "@subject"), ("identity", "@identity")])
+    # Add segment plot to the figure
+    segment = p.segment('x0', 'y0', 'x1', 'y1', color=transform('identity', mapper), source=source, line_width=1)
+
+    # Add the HoverTool to the plot, resolving contig codes back to names
+    hover_lines = HoverTool(renderers=[segment], tooltips=[("x", "@query{custom}"), ("y", "@subject{custom}"), ("identity", "@identity")],
+                            formatters={'@query': contig_hover(x_names), '@subject': contig_hover(y_names)})
+    if 'members' in alignments:
+        # Chains also report how many alignments they merge and the query span they cover
+        hover_lines.tooltips += [("alignments", "@members"), ("span", "@x0{custom}")]
+        hover_lines.formatters['@x0'] = CustomJSHover(args=dict(source=source), code="""
+            const i = special_vars.index;
+            return (source.data['x1'][i] - source.data['x0'][i]).toLocaleString() + " bp";
+        """)
     p.add_tools(hover_lines)
 
+    # Large comparisons are shown as identity images, switching to the segments once few enough are in view
+    images = None
+    if len(identities) > overview_threshold:
+        x_end, y_end = x_cumulative_length_dict["end"], y_cumulative_length_dict["end"]
+        overview_mapper = LinearColorMapper(palette=cmap_hex, low=1, high=255, low_color=(0, 0, 0, 0))
+        # The first image has a bin per screen pixel of the whole plot, and each finer one is cut into tiles so that
+        # only the parts holding alignments are embedded
+        images = overview_images(segments['x0'], segments['y0'], segments['x1'], segments['y1'], identities, x_end, y_end, plot_width, plot_height, overview_levels)
+        overviews = [p.image(image='image', x='x', y='y', dw='dw', dh='dh', source=ColumnDataSource(data=image_tiles(image, x_end, y_end, max(plot_width // 2, 1), max(plot_height // 2, 1))), color_mapper=overview_mapper, visible=False) for image in images]
+        overviews[0].visible = True
+        segment.visible = False
+        # The segments are reordered by grid key so the browser counts those in view from the grid cells it covers,
+        # as segments_in_rectangle does, instead of testing every segment
+        index = segment_index(dict(source.data), x_end, y_end)
+        source.data = {name: index[name] for name in source.data}
+        cell_keys, cell_starts = np.unique(index['key'], return_index=True)
+        cell_source = ColumnDataSource(data={'key': cell_keys.astype(np.int32), 'start': cell_starts.astype(np.int32)})
+        overview_callback = CustomJS(args=dict(source=source, cells=cell_source, levels=int(index['grid'][0]), segments=segment, overviews=overviews, widths=[image.shape[1] for image in images], heights=[image.shape[0] for image in images], x_range=p.x_range, y_range=p.y_range, x_end=x_end, y_end=y_end, frame_width=plot_width, frame_height=plot_height, threshold=overview_threshold), code="""
+            const {x0, x1, y0, y1} = source.data;
+            const {key, start} = cells.data;
+            const [x_start, x_stop, y_start, y_stop] = [x_range.start, x_range.end, y_range.start, y_range.end];
+            const bound = (target, upper) => {
+                let [lo, hi] = [0, key.length];
+                while (lo < hi) {
+                    const middle = (lo + hi) >>> 1;
+                    if (key[middle] < target || (upper && key[middle] === target)) {
+                        lo = middle + 1;
+                    } else {
+                        hi = middle;
+                    }
+                }
+                return lo;
+            };
+            // A segment is keyed by the cell of its lower left corner, so each level is read from one cell before the view on each axis
+            let visible = 0;
+            for (let level = 0; level <= levels && visible <= threshold; level++) {
+                const cells = 2 ** level;
+                const cell = (value, end) => Math.min(Math.max(Math.floor(value * cells / end), 0), cells - 1);
+                const [first_column, last_column] = [Math.max(cell(x_start, x_end) - 1, 0), cell(x_stop, x_end)];
+                const [first_row, last_row] = [Math.max(cell(y_start, y_end) - 1, 0), cell(y_stop, y_end)];
+                const offset = (cells * cells - 1) / 3;
+                for (let row = first_row; row <= last_row && visible <= threshold; row++) {
+                    const [lo, hi] = [bound(offset + row * cells + first_column, false), bound(offset + row * cells + last_column, true)];
+                    const [first, last] = [lo < key.length ? start[lo] : x0.length, hi < key.length ? start[hi] : x0.length];
+                    for (let i = first; i < last && visible <= threshold; i++) {
+                        if (Math.max(x0[i], x1[i]) >= x_start && Math.min(x0[i], x1[i]) <= x_stop && Math.max(y0[i], y1[i]) >= y_start && Math.min(y0[i], y1[i]) <= y_stop) {
+                            visible++;
+                        }
+                    }
+                }
+            }
+            segments.visible = visible <= threshold;
+
+            // Coarsest image that still has a bin per screen pixel in view on both axes
+            const [x_fraction, y_fraction] = [(x_stop - x_start) / x_end, (y_stop - y_start) / y_end];
+            let level = widths.findIndex((width, i) => width * x_fraction >= frame_width && heights[i] * y_fraction >= frame_height);
+            if (level === -1) {
+                level = overviews.length - 1;
+            }
+            overviews.forEach((overview, i) => overview.visible = !segments.visible && i === level);
+        """)
+        p.js_on_event(RangesUpdate, overview_callback)
+
+    # Fit the initial view to the alignments only, not the boundary and feature glyphs
+    if not x_region:
+        p.x_range.renderers = [segment]
+    if not y_region:
+        p.y_range.renderers = [segment]
+
     # Configure the x-axis and y-axis tick formatters
     p.xaxis.formatter = NumeralTickFormatter(format="0,0")
     p.yaxis.formatter = NumeralTickFormatter(format="0,0")
@@ -255,37 +1712,28 @@ def plot_interactive_bokeh(threshold, size_threshold, x_cumulative_length_dict,
     p.add_layout(color_bar, 'below')
 
     # Plot features
-    def plot_feature(bed_file, cumulative_length_dict, axis, color):
-        features = []
-        with open(bed_file) as file:
-            for line in file:
-                line = line.rstrip("\n")
-                fields = line.split("\t")
-                feature_start = int(fields[1]) + int(cumulative_length_dict[fields[0]])
-                feature_end = int(fields[2]) + int(cumulative_length_dict[fields[0]])
-                if axis == "x":
-                    box = BoxAnnotation(left=feature_start, right=feature_end, fill_color=color, fill_alpha=0.3)
-                elif axis == "y":
-                    box = BoxAnnotation(bottom=feature_start, top=feature_end, fill_color=color, fill_alpha=0.3)
-                features.append(box)
-                p.add_layout(box)
-        return features
+    def plot_feature(bed, axis, color):
+        source = ColumnDataSource(data={'start': bed['start'], 'end': bed['end']})
+        if axis == "x":
+            return p.vstrip(x0='start', x1='end', source=source, fill_color=color, fill_alpha=0.3, line_color='#cccccc', line_alpha=0.3)
+        elif axis == "y":
+            return p.hstrip(y0='start', y1='end', source=source, fill_color=color, fill_alpha=0.3, line_color='#cccccc', line_alpha=0.3)
 
     # Initial feature color
     initial_color = 'green'
-    x_features = []
-    y_features = []
+    x_features = None
+    y_features = None
     if x_feature_bed_file:
-        x_features = plot_feature(x_feature_bed_file, x_cumulative_length_dict, "x", initial_color)
+        x_features = plot_feature(inputs["x feature bed file"], "x", initial_color)
     if y_feature_bed_file:
-        y_features = plot_feature(y_feature_bed_file, y_cumulative_length_dict, "y", initial_color)
+        y_features = plot_feature(inputs["y feature bed file"], "y", initial_color)
 
     if curation_mode == True:
         # Div widget to display selected contigs
         selected_contigs_div = Div(text="<b>Selected Contigs:</b><br>", width=200, height=400)
 
         # JavaScript callback to update Div with selected contigs
-        callback = CustomJS(args=dict(source=source, contigs_div=selected_contigs_div), code="""
+        callback = CustomJS(args=dict(source=source, names=x_names, contigs_div=selected_contigs_div), code="""
             var indices = source.selected.indices;
             var data = source.data;
             var selected_contigs = [];
@@ -300,7 +1748,7 @@ def plot_interactive_bokeh(threshold, size_threshold, x_cumulative_length_dict,
 
             // Toggle selection of newly clicked contigs
             for (var i = 0; i < indices.length; i++) {
-                var contig = data['query'][indices[i]];
+                var contig = names[data['query'][indices[i]]];
                 var contigIndex = selected_contigs.indexOf(contig);
                 if (contigIndex === -1) {
                     selected_contigs.push(contig); // Add contig if not already selected
@@ -355,9 +1803,7 @@ def plot_interactive_bokeh(threshold, size_threshold, x_cumulative_length_dict,
     if x_feature_bed_file:
         # JavaScript callback to toggle feature visibility
         x_toggle_callback = CustomJS(args=dict(features=x_features), code="""
-            for (var i = 0; i < features.length; i++) {
-                features[i].visible = !features[i].visible;
-            }
+            features.visible = !features.visible;
         """)
 
         # Add a button to toggle feature visibility
@@ -366,10 +1812,7 @@ def plot_interactive_bokeh(threshold, size_threshold, x_cumulative_length_dict,
 
         # JavaScript callback to update feature colors
         x_update_color_callback = CustomJS(args=dict(features=x_features), code="""
-            var color = cb_obj.value;
-            for (var i = 0; i < features.length; i++) {
-                features[i].fill_color = color;
-            }
+            features.glyph.fill_color = cb_obj.value;
         """)
 
         # Add a dropdown menu to select feature color
@@ -379,9 +1822,7 @@ def plot_interactive_bokeh(threshold, size_threshold, x_cumulative_length_dict,
     if y_feature_bed_file:
         # JavaScript callback to toggle feature visibility
         y_toggle_callback = CustomJS(args=dict(features=y_features), code="""
-            for (var i = 0; i < features.length; i++) {
-                features[i].visible = !features[i].visible;
-            }
+            features.visible = !features.visible;
         """)
 
         # Add a button to toggle feature visibility
@@ -390,10 +1831,7 @@ def plot_interactive_bokeh(threshold, size_threshold, x_cumulative_length_dict,
 
         # JavaScript callback to update feature colors
         y_update_color_callback = CustomJS(args=dict(features=y_features), code="""
-            var color = cb_obj.value;
-            for (var i = 0; i < features.length; i++) {
-                features[i].fill_color = color;
-            }
+            features.glyph.fill_color = cb_obj.value;
         """)
 
         # Add a dropdown menu to select feature color
@@ -401,135 +1839,20 @@ def plot_interactive_bokeh(threshold, size_threshold, x_cumulative_length_dict,
         y_color_select.js_on_change("value", y_update_color_callback)
     
     if x_track_bed_file:
-        # Generate x track data
-        x_track_data, x_window_size = track(x_track_bed_file, x_cumulative_length_dict)
-        source = ColumnDataSource(data=x_track_data)
-
-        # Create a Bokeh plot
-        y_axis_maximum_value = max(x_track_data["value"])
-        j = figure(title=x_track_title, y_axis_label=x_track_feature_name, width=plot_width, height=150, x_range=p.x_range, min_border_left=100, tools="pan", y_axis_type="log",  y_range=[1,y_axis_maximum_value])
-        j.output_backend="svg"
-        # Add vertical bars for the quantitative track
-        vbar = j.vbar(x='position', top='value', width=x_window_size, source=source, line_color=x_track_colour, fill_color=x_track_colour, bottom=1e-10)
-        # Add the HoverTool to the plot
-        hover = HoverTool(renderers=[vbar], tooltips=[("Sequence", "@sequence"), ("Position", "@position"), (x_track_feature_name, "@value")])
-        j.add_tools(hover)
-
-        # Configure the x-axis and y-axis tick formatters
-        j.xaxis.formatter = NumeralTickFormatter(format="0")
-        j.yaxis.formatter = NumeralTickFormatter(format="0")
-        j.yaxis.formatter = NumeralTickFormatter(format="0,0") #add commas to numbers
-
-        #remove shared axis ticks
-        j.xaxis.major_tick_line_color = None
-        j.xaxis.major_label_text_font_size = '0pt'
-
-        #remove bokeh grids and add grid lines to match contig boundaries
-        j.xgrid.visible = False
-        j.ygrid.visible = True
-        j.ygrid.grid_line_dash = [4, 4]
-        for x_position in x_cumulative_length_dict.values():
-            vline = Span(location=x_position, dimension='height', line_color='grey', line_width=0.5)
-            j.add_layout(vline) 
-
-        #add autohide
-        j.toolbar.autohide = True
-    
+        # Generate the x track panel, from its windows down to summaries a pixel wide
+        j, _ = track_panel(track_levels(*inputs["x track bed file"], plot_width), "x", p.x_range, plot_width, x_cumulative_length_dict["end"], x_track_title, x_track_feature_name, x_track_colour, x_names, output_backend, boundaries)
+
     if y_track_bed_file:
-        # Generate y track data
-        y_track_data, y_window_size = track(y_track_bed_file, y_cumulative_length_dict)
-        source = ColumnDataSource(data=y_track_data)
-
-        # Create a Bokeh plot
-        x_axis_maximum_value = max(y_track_data["value"])
-        c = figure(title=y_track_title, x_axis_label=y_track_feature_name, height=plot_height, width=200, y_range=p.y_range, tools="pan", x_axis_type="log", x_range=[1, x_axis_maximum_value])
-        c.output_backend="svg"
-        # Add vertical bars for the y track
-        hbar = c.hbar(y='position', right='value', height=y_window_size, source=source, line_color=y_track_colour, fill_color=y_track_colour, left=1e-10)
-        # Add the HoverTool to the plot
-        hover = HoverTool(renderers=[hbar], tooltips=[("Sequence", "@sequence"), ("Position", "@position"), (y_track_feature_name, "@value")])
-        c.add_tools(hover)
-
-        # Configure the x-axis and y-axis tick formatters
-        c.xaxis.formatter = NumeralTickFormatter(format="0")
-        c.yaxis.formatter = NumeralTickFormatter(format="0")
-        c.xaxis.formatter = NumeralTickFormatter(format="0,0")
-
-        #remove shared axis ticks
-        c.yaxis.major_tick_line_color = None
-        c.yaxis.major_label_text_font_size = '0pt'
-        c.xaxis.major_label_text_font_size = '6pt'
-
-        #remove bokeh grids
-        c.xgrid.visible = True
-        c.ygrid.visible = False
-        c.xgrid.grid_line_dash = [4, 4]
-        for y_position in y_cumulative_length_dict.values():
-            hline = Span(location=y_position, dimension='width', line_color='grey', line_width=0.5)
-            c.add_layout(hline) 
-        
-        #add autohide
-        c.toolbar.autohide = True
+        # Generate the y track panel
+        c, _ = track_panel(track_levels(*inputs["y track bed file"], plot_height), "y", p.y_range, plot_height, y_cumulative_length_dict["end"], y_track_title, y_track_feature_name, y_track_colour, y_names, output_backend, boundaries)
 
     if x_annotation_bed_file:
-        # Generate x annotation data
-        x_annotations_data, start_positions, end_positions, strands= annotation(x_annotation_bed_file, x_cumulative_length_dict)
-        source = ColumnDataSource(data=x_annotations_data)
-
-        a_x = figure(title="Annotation Track", width=plot_width, height=100, x_range=p.x_range, min_border_left=100, tools="pan", y_range=Range1d(-0.5, 0.5))
-        multi_line = a_x.multi_line('x', 'y', color='color', source=source, line_width=25)
-        a_x.output_backend="svg"
-
-        # Add the HoverTool to the plot
-        hover_lines = HoverTool(renderers=[multi_line], tooltips=[("Name", "@name"), ("Start Position", "@start"), ("End Position", "@end"), ("Strand", "@strand"), ("Location", "@location")])
-        a_x.add_tools(hover_lines)
-
-        #remove axes ticks
-        a_x.xaxis.major_tick_line_color = None
-        a_x.xaxis.major_label_text_font_size = '0pt'
-        a_x.yaxis.major_tick_line_color = None
-        a_x.yaxis.major_label_text_font_size = '0pt'
-        
-        #remove bokeh grids and add grid lines to match contig boundaries
-        a_x.xgrid.visible = False
-        a_x.ygrid.visible = True
-        a_x.ygrid.grid_line_dash = [4, 4]
-        for x_position in x_cumulative_length_dict.values():
-            vline = Span(location=x_position, dimension='height', line_color='grey', line_width=0.5)
-            a_x.add_layout(vline) 
-        
-        #add autohide
-        a_x.toolbar.autohide = True
+        x_annotations = inputs["x annotation bed file"]
+        a_x, _ = annotation_panel(x_annotations, annotation_pyramid(x_annotations, x_cumulative_length_dict["end"], plot_width), "x", p.x_range, plot_width, x_cumulative_length_dict["end"], x_names, output_backend, boundaries)
 
     if y_annotation_bed_file:
-        # Generate x annotation data
-        y_annotations_data, start_positions, end_positions, strands= annotation(y_annotation_bed_file, y_cumulative_length_dict)
-        source = ColumnDataSource(data=y_annotations_data)
-
-        a_y = figure(title="Annotation Track", height=plot_height, width=150, y_range=p.y_range, tools="pan", x_range=Range1d(-0.5, 0.5))
-        multi_line = a_y.multi_line('y', 'x', color='color', source=source, line_width=25)
-        a_y.output_backend="svg"
-
-        # Add the HoverTool to the plot
-        hover_lines = HoverTool(renderers=[multi_line], tooltips=[("Name", "@name"), ("Start Position", "@start"), ("End Position", "@end"), ("Strand", "@strand"), ("Location", "@location")])
-        a_y.add_tools(hover_lines)
-
-        #remove axes ticks
-        a_y.xaxis.major_tick_line_color = None
-        a_y.xaxis.major_label_text_font_size = '0pt'
-        a_y.yaxis.major_tick_line_color = None
-        a_y.yaxis.major_label_text_font_size = '0pt'
-        
-        #remove bokeh grids and add grid lines to match contig boundaries
-        a_y.xgrid.visible = True
-        a_y.ygrid.visible = False
-        a_y.xgrid.grid_line_dash = [4, 4]
-        for y_position in y_cumulative_length_dict.values():
-            hline = Span(location=y_position, dimension='width', line_color='grey', line_width=0.5)
-            a_y.add_layout(hline) 
-    
-        #add autohide
-        a_y.toolbar.autohide = True
+        y_annotations = inputs["y annotation bed file"]
+        a_y, _ = annotation_panel(y_annotations, annotation_pyramid(y_annotations, y_cumulative_length_dict["end"], plot_height), "y", p.y_range, plot_height, y_cumulative_length_dict["end"], y_names, output_backend, boundaries)
 
     title = Div(text=f"<h1>{plot_title}</h1>", width=plot_width, height=50, styles={'text-align': 'center'})
     
@@ -542,260 +1865,196 @@ def plot_interactive_bokeh(threshold, size_threshold, x_cumulative_length_dict,
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, j, a_x, row(p, a_y, c), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, a_x, row(p, a_y, c))
                     else:
                         layout = column(title, j, a_x, row(p, c), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, a_x, row(p, c))
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, j, row(p, a_y, c), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, row(p, a_y, c))
                     else:
                         layout = column(title, j, row(p, c), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, row(p, c))
                 
             elif y_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, a_x, row(p, a_y, c), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, a_x, row(p, a_y, c))
                     else:
                         layout = column(title, a_x, row(p, c), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, a_x, row(p, c))
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, row(p, a_y, c), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, row(p, a_y, c))
                     else:
                         layout = column(title, row(p, c), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, row(p, c))
             
             elif x_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, j, a_x, row(p, a_y), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, a_x, row(p, a_y))
                     else:
                         layout = column(title, j, a_x, p, row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, a_x, p)
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, j, row(p, a_y), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, row(p, a_y))
                     else:
                         layout = column(title, j, p, row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, p)
             
             else:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, a_x, row(p, a_y), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, a_x, row(p, a_y))
                     else:
                         layout = column(title, a_x, p, row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, a_x, p)
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, row(p, a_y), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, row(p, a_y))
                     else:
                         layout = column(title, p, row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, p)
         
         elif x_feature_bed_file:
             if y_track_bed_file and x_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, j, a_x, row(p, a_y, c), row(column(x_toggle_button, x_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, a_x, row(p, a_y, c))
                     else:
                         layout = column(title, j, a_x, row(p, c), row(column(x_toggle_button, x_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, a_x, row(p, c))
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, j, row(p, a_y, c), row(column(x_toggle_button, x_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, row(p, a_y, c))
                     else:
                         layout = column(title, j, row(p, c), row(column(x_toggle_button, x_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, row(p, c))
 
             elif y_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, a_x, row(p, a_y, c), row(column(x_toggle_button, x_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, a_x, row(p, a_y, c))
                     else:
                         layout = column(title, a_x, row(p, c), row(column(x_toggle_button, x_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, a_x, row(p, c))
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, row(p, a_y, c), row(column(x_toggle_button, x_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, row(p, a_y, c))
                     else:
                         layout = column(title, row(p, c), row(column(x_toggle_button, x_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, row(p, c))
                 
             elif x_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, j, a_x, row(p, a_y), row(column(x_toggle_button, x_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, a_x, row(p, a_y))
                     else:
                         layout = column(title, j, a_x, p, row(column(x_toggle_button, x_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, a_x, p)
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, j, row(p, a_y), row(column(x_toggle_button, x_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, row(p, a_y))
                     else:
                         layout = column(title, j, p, row(column(x_toggle_button, x_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, p)
             
             else:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, a_x, row(p, a_y), row(column(x_toggle_button, x_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, a_x, row(p, a_y))
                     else:
                         layout = column(title, a_x, p, row(column(x_toggle_button, x_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, a_x, p)
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, row(p, a_y), row(column(x_toggle_button, x_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, row(p, a_y))
                     else:
                         layout = column(title, p, row(column(x_toggle_button, x_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, p)
                 
         elif y_feature_bed_file:
             if y_track_bed_file and x_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, j, a_x, row(p, a_y, c), row(column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, a_x, row(p, a_y, c))
                     else:
                         layout = column(title, j, a_x, row(p, c), row(column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, a_x, row(p, c))
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, j, row(p, a_y, c), row(column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, row(p, a_y, c))
                     else:
                         layout = column(title, j, row(p, c), row(column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, row(p, c))
             
             elif y_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, a_x, row(p, a_y, c), row(column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, a_x, row(p, a_y, c))
                     else:
                         layout = column(title, a_x, row(p, c), row(column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, a_x, row(p, c))
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, row(p, a_y, c), row(column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, row(p, a_y, c))
                     else:
                         layout = column(title, row(p, c), row(column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, row(p, c))
             
             elif x_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, j, a_x, row(p, a_y), row(column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, a_x, row(p, a_y))
                     else:
                         layout = column(title, j, a_x, p, row(column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, a_x, p)
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, j, row(p, a_y), row(column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, row(p, a_y))
                     else:
                         layout = column(title, j, p, row(column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, j, p)
             
             else:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, a_x, row(p, a_y), row(column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, a_x, row(p, a_y))
                     else:
                         layout = column(title, a_x, p, row(column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, a_x, p)
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, row(p, a_y), row(column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, row(p, a_y))
                     else:
                         layout = column(title, p, row(column(y_toggle_button, y_color_select), selected_contigs_div, download_button))
-                        static_layout = column(title, p)
         
         else:
             if y_track_bed_file and x_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, j, a_x, row(p, a_y, c), row(selected_contigs_div, download_button))
-                        static_layout = column(title, j, a_x, row(p, a_y, c))
                     else:
                         layout = column(title, j, a_x, row(p, c), row(selected_contigs_div, download_button))
-                        static_layout = column(title, j, a_x, row(p, c))
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, j, row(p, a_y, c), row(selected_contigs_div, download_button))
-                        static_layout = column(title, j, row(p, a_y, c))
                     else:
                         layout = column(title, j, row(p, c), row(selected_contigs_div, download_button))
-                        static_layout = column(title, j, row(p, c))
             
             elif y_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, a_x, row(p, a_y, c), row(selected_contigs_div, download_button))
-                        static_layout = column(title, a_x, row(p, a_y, c))
                     else:
                         layout = column(title, a_x, row(p, c), row(selected_contigs_div, download_button))
-                        static_layout = column(title, a_x, row(p, c))
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, row(p, a_y, c), row(selected_contigs_div, download_button))
-                        static_layout = column(title, row(p, a_y, c))
                     else:
                         layout = column(title, row(p, c), row(selected_contigs_div, download_button))
-                        static_layout = column(title, row(p, c))
 
             elif x_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, j, a_x, row(p, a_y), row(selected_contigs_div, download_button))
-                        static_layout = column(title, j, a_x, row(p, a_y))
                     else:
                         layout = column(title, j, a_x, p, row(selected_contigs_div, download_button))
-                        static_layout = column(title, j, a_x, p)
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, j, row(p, a_y), row(selected_contigs_div, download_button))
-                        static_layout = column(title, j, row(p, a_y))
                     else:
                         layout = column(title, j, p, row(selected_contigs_div, download_button))
-                        static_layout = column(title, j, p)
             
             else:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, a_x, row(p, a_y), row(selected_contigs_div, download_button))
-                        static_layout = column(title, a_x, row(p, a_y))
                     else:
                         layout = column(title, a_x, p, row(selected_contigs_div, download_button))
-                        static_layout = column(title, a_x, p)
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, row(p, a_y), row(selected_contigs_div, download_button))
-                        static_layout = column(title, row(p, a_y))
                     else:
                         layout = column(title, p, row(selected_contigs_div, download_button))
-                        static_layout = column(title, p)
     
     elif curation_mode == False:
         if x_feature_bed_file and y_feature_bed_file:
@@ -804,79 +2063,60 @@ def plot_interactive_bokeh(threshold, size_threshold, x_cumulative_length_dict,
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, j, a_x, row(p, a_y, c), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, j, a_x, row(p, a_y, c))
                     else:
                         layout = column(title, j, a_x, row(p, c), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, j, a_x, row(p, c))
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, j, row(p, a_y, c), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, j, row(p, a_y, c))
                     else:
                         layout = column(title, j, row(p, c), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, j, row(p, c))
                 
             elif y_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, a_x, row(p, a_y, c), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, a_x, row(p, a_y, c))
                     else:
                         layout = column(title, a_x, row(p, c), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, a_x, row(p, c))
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, row(p, a_y, c), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, row(p, a_y, c))
                     else:
                         layout = column(title, row(p, c), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, row(p, c))
             
             elif x_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, j, a_x, row(p, a_y), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, j, a_x, row(p, a_y))
                     else:
                         layout = column(title, j, a_x, p, row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, j, a_x, p)
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, j, row(p, a_y), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, j, row(p, a_y))
                     else:
                         layout = column(title, j, p, row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, j, p)
             
             else:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, a_x, row(p, a_y), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, a_x, row(p, a_y))
                     else:
                         layout = column(title, a_x, p, row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, a_x, p)
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, row(p, a_y), row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, row(p, a_y))
                     else:
                         layout = column(title, p, row(column(x_toggle_button, x_color_select), column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, p)
         
         elif x_feature_bed_file:
             if y_track_bed_file and x_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, j, a_x, row(p, a_y, c), row(column(x_toggle_button, x_color_select)))
-                        static_layout = column(title, j, a_x, row(p, a_y, c))
                     else:
                         layout = column(title, j, a_x, row(p, c), row(column(x_toggle_button, x_color_select)))
-                        static_layout = column(title, j, a_x, row(p, c))
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, j, row(p, a_y, c), row(column(x_toggle_button, x_color_select)))
-                        static_layout = column(title, j, row(p, a_y, c))
                     else:
                         layout = column(title, j, row(p, c), row(column(x_toggle_button, x_color_select)))
 
@@ -884,195 +2124,445 @@ def plot_interactive_bokeh(threshold, size_threshold, x_cumulative_length_dict,
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, a_x, row(p, a_y, c), row(column(x_toggle_button, x_color_select)))
-                        static_layout = column(title, a_x, row(p, a_y, c))
                     else:
                         layout = column(title, a_x, row(p, c), row(column(x_toggle_button, x_color_select)))
-                        static_layout = column(title, a_x, row(p, c))
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, row(p, a_y, c), row(column(x_toggle_button, x_color_select)))
-                        static_layout = column(title, row(p, a_y, c))
                     else:
                         layout = column(title, row(p, c), row(column(x_toggle_button, x_color_select)))
-                        static_layout = column(title, row(p, c))
                 
             elif x_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, j, a_x, row(p, a_y), row(column(x_toggle_button, x_color_select)))
-                        static_layout = column(title, j, a_x, row(p, a_y))
                     else:
                         layout = column(title, j, a_x, p, row(column(x_toggle_button, x_color_select)))
-                        static_layout = column(title, j, a_x, p)
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, j, row(p, a_y), row(column(x_toggle_button, x_color_select)))
-                        static_layout = column(title, j, row(p, a_y))
                     else:
                         layout = column(title, j, p, row(column(x_toggle_button, x_color_select)))
-                        static_layout = column(title, j, p)
             
             else:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, a_x, row(p, a_y), row(column(x_toggle_button, x_color_select)))
-                        static_layout = column(title, a_x, row(p, a_y))
                     else:
                         layout = column(title, a_x, p, row(column(x_toggle_button, x_color_select)))
-                        static_layout = column(title, a_x, p)
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, row(p, a_y), row(column(x_toggle_button, x_color_select)))
-                        static_layout = column(title, row(p, a_y))
                     else:
                         layout = column(title, p, row(column(x_toggle_button, x_color_select)))
-                        static_layout = column(title, p)
                 
         elif y_feature_bed_file:
             if y_track_bed_file and x_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, j, a_x, row(p, a_y, c), row(column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, j, a_x, row(p, a_y, c))
                     else:
                         layout = column(title, j, a_x, row(p, c), row(column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, j, a_x, row(p, c))
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, j, row(p, a_y, c), row(column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, j, row(p, a_y, c))
                     else:
                         layout = column(title, j, row(p, c), row(column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, j, row(p, c))
             
             elif y_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, a_x, row(p, a_y, c), row(column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, a_x, row(p, a_y, c))
                     else:
                         layout = column(title, a_x, row(p, c), row(column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, a_x, row(p, c))
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, row(p, a_y, c), row(column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, row(p, a_y, c))
                     else:
                         layout = column(title, row(p, c), row(column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, row(p, c))
             
             elif x_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, j, a_x, row(p, a_y), row(column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, j, a_x, row(p, a_y))
                     else:
                         layout = column(title, j, a_x, p, row(column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, j, a_x, p)
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, j, row(p, a_y), row(column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, j, row(p, a_y))
                     else:
                         layout = column(title, j, p, row(column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, j, p)
             
             else:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, a_x, row(p, a_y), row(column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, a_x, row(p, a_y))
                     else:
                         layout = column(title, a_x, p, row(column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, a_x, p)
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, row(p, a_y), row(column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, row(p, a_y))
                     else:
                         layout = column(title, p, row(column(y_toggle_button, y_color_select)))
-                        static_layout = column(title, p)
         
         else:
             if y_track_bed_file and x_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, j, a_x, row(p, a_y, c))
-                        static_layout = column(title, j, a_x, row(p, a_y, c))
                     else:
                         layout = column(title, j, a_x, row(p, c))
-                        static_layout = column(title, j, a_x, row(p, c))
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, j, row(p, a_y, c))
-                        static_layout = column(title, j, row(p, a_y, c))
                     else:
                         layout = column(title, j, row(p, c))
-                        static_layout = column(title, j, row(p, c))
             
             elif y_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, a_x, row(p, a_y, c))
-                        static_layout = column(title, a_x, row(p, a_y, c))
                     else:
                         layout = column(title, a_x, row(p, c))
-                        static_layout = column(title, a_x, row(p, c))
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, row(p, a_y, c))
-                        static_layout = column(title, row(p, a_y, c))
                     else:
                         layout = column(title, row(p, c))
-                        static_layout = column(title, row(p, c))
 
             elif x_track_bed_file:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, j, a_x, row(p, a_y))
-                        static_layout = column(title, j, a_x, row(p, a_y))
                     else:
                         layout = column(title, j, a_x, p)
-                        static_layout = column(title, j, a_x, p)
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, j, row(p, a_y))
-                        static_layout = column(title, j, row(p, a_y))
                     else:
                         layout = column(title, j, p)
-                        static_layout = column(title, j, p)
             
             else:
                 if x_annotation_bed_file:
                     if y_annotation_bed_file:
                         layout = column(title, a_x, row(p, a_y))
-                        static_layout = column(title, a_x, row(p, a_y))
                     else:
                         layout = column(title, a_x, p)
-                        static_layout = column(title, a_x, p)
                 else:
                     if y_annotation_bed_file:
                         layout = column(title, row(p, a_y))
-                        static_layout = column(title, row(p, a_y))
                     else:
                         layout = column(title, p)
-                        static_layout = column(title, p)
 
-    # Save and show final plot
-    html_output_file = output_prefix + ".html"
-    output_file(html_output_file)
+    # Draw the requested static outputs straight from the parsed arrays, each in its own process,
+    # while the html is saved here; a large png reuses an overview image, the svg always draws every alignment as a vector
+    static_files = [f"{output_prefix}.{output}" for output in ("png", "svg") if output in outputs]
+    png_overview = images[min(1, len(images) - 1)] if images else None
+    render = partial(render_static, segments=segments, identities=identities, x_cumulative_length_dict=x_cumulative_length_dict, y_cumulative_length_dict=y_cumulative_length_dict,
+                     plot_title=plot_title, plot_width=plot_width, plot_height=plot_height,
+                     x_features=inputs.get("x feature bed file"), y_features=inputs.get("y feature bed file"),
+                     x_track=(*inputs["x track bed file"], x_track_title, x_track_feature_name, x_track_colour) if x_track_bed_file else None,
+                     y_track=(*inputs["y track bed file"], y_track_title, y_track_feature_name, y_track_colour) if y_track_bed_file else None,
+                     x_annotations=inputs.get("x annotation bed file"), y_annotations=inputs.get("y annotation bed file"), feature_color=initial_color)
+    with ProcessPoolExecutor(max(len(static_files), 1)) as pool:
+        futures = {pool.submit(timed, partial(render, [static_file], overview=png_overview if static_file.endswith(".png") else None)): static_file for static_file in static_files}
+        if "html" in outputs:
+            # Save and show final plot
+            html_output_file = output_prefix + ".html"
+            output_file(html_output_file)
+
+            #show(layout)
+            _, seconds = timed(partial(save, layout))
+            print(f"Wrote {html_output_file} in {seconds:.2f} s")
+        for future in as_completed(futures):
+            _, seconds = future.result()
+            print(f"Wrote {futures[future]} in {seconds:.2f} s")
+
+
+def serve_dotplot(threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, plot_title, plot_width, plot_height, coords_file=None, paf_file=None, delta_file=None, x_feature_bed_file=None, y_feature_bed_file=None, x_track_bed_file=None, x_track_title=None, x_track_feature_name=None, x_track_colour=None, y_track_bed_file=None, y_track_title=None, y_track_feature_name=None, y_track_colour=None, x_annotation_bed_file=None, y_annotation_bed_file=None, threads=1, cache_dir=None, cache_size=CACHE_SIZE, x_region=None, y_region=None, output_backend="webgl", chain_gap=None, port=SERVE_PORT, segment_limit=SERVE_SEGMENT_LIMIT):
     
-    #show(layout)
-    save(layout)
+    """Serve the dot plot from a bokeh server, sending the browser only the alignments, track bins and annotations in view on every pan and zoom
     
-    #save layout as png
-    png_output_file = output_prefix + ".png"
-    export_png(static_layout, filename=png_output_file, scale_factor=3)
-
-    #save layout as svg
-    svg_output_file = output_prefix + ".svg"
-    export_svg(static_layout, filename=svg_output_file, timeout=1200)
-
+    Taps and box selections are answered from the segment index of the store, over all alignments rather than the ones sent."""
+    
+    from bokeh.server.server import Server
+    from bokeh.application import Application
+    from bokeh.application.handlers.function import FunctionHandler
+    from bokeh.plotting import figure
+    from bokeh.models import HoverTool, ColumnDataSource, NumeralTickFormatter, Div, Range1d, WheelZoomTool, BoxSelectTool, LinearColorMapper, ColorBar
+    from bokeh.layouts import column, row
+    from bokeh.transform import transform
+    from bokeh.events import RangesUpdate, Tap, SelectionGeometry
+
+    x_end, y_end = x_cumulative_length_dict["end"], y_cumulative_length_dict["end"]
+    x_names, y_names = list(x_cumulative_length_dict), list(y_cumulative_length_dict)
+
+    # The segment store lives next to the alignment cache, so a restarted server skips parsing; without a cache it only lasts this run
+    alignment_file, parse_block = (paf_file, parse_paf_block) if paf_file else (delta_file, parse_delta_block) if delta_file else (coords_file, parse_nucmer_coords_block)
+    temporary = None
+    if cache_dir is not None and os.path.isfile(alignment_file):
+        os.makedirs(cache_dir, exist_ok=True)
+        entry = os.path.join(cache_dir, alignment_cache_key(alignment_file, parse_block, threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict) + f".grid{'' if chain_gap is None else chain_gap}")
+    else:
+        temporary = tempfile.mkdtemp(prefix="hyraxdotplot.")
+        entry = os.path.join(temporary, "grid")
+        #remove the store however the server stops, also when a scheduler or timeout sends SIGTERM
+        atexit.register(shutil.rmtree, temporary, ignore_errors=True)
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+    # Load the alignments, unless already stored, and all bed files at the same time
+    loaders = input_loaders(threshold, size_threshold, x_cumulative_length_dict, y_cumulative_length_dict, coords_file=coords_file, paf_file=paf_file, delta_file=delta_file, threads=threads, cache_dir=cache_dir, cache_size=cache_size, x_region=x_region, y_region=y_region, x_feature_bed_file=x_feature_bed_file, y_feature_bed_file=y_feature_bed_file, x_track_bed_file=x_track_bed_file, y_track_bed_file=y_track_bed_file, x_annotation_bed_file=x_annotation_bed_file, y_annotation_bed_file=y_annotation_bed_file, with_alignments=not os.path.isdir(entry))
+    inputs = load_concurrently(loaders)
+
+    if "alignments" in inputs:
+        alignments = inputs["alignments"]
+        if chain_gap is not None:
+            alignments = chain_alignments(alignments, chain_gap)
+        _, seconds = timed(partial(build_segment_store, entry, alignments, x_end, y_end))
+        print(f"Indexed {len(alignments['identity'])} alignments in {seconds:.2f} s")
+        if temporary is None:
+            evict_alignment_cache(cache_dir, cache_size)
+    else:
+        #mark the entry as recently used
+        os.utime(entry)
+    store = read_segment_store(entry)
+    identity_low, identity_high = (float(value) for value in store['identity_range'])
+    coordinate_type = np.int32 if max(x_end, y_end) < 2**31 else np.float64
+
+    # Every session reads the same store, bed indexes and track levels; only the views differ
+    features = {axis: feature_index(inputs[f"{axis} feature bed file"]) for axis in "xy" if f"{axis} feature bed file" in inputs}
+    tracks = {axis: track_levels(*inputs[f"{axis} track bed file"], plot_width if axis == "x" else plot_height) for axis in "xy" if f"{axis} track bed file" in inputs}
+    annotations = {axis: (inputs[f"{axis} annotation bed file"], annotation_pyramid(inputs[f"{axis} annotation bed file"], x_end if axis == "x" else y_end, plot_width if axis == "x" else plot_height)) for axis in "xy" if f"{axis} annotation bed file" in inputs}
+    cmap_hex = identity_palette()
+
+    def make_document(doc):
+        """build one browser session, whose sources are refilled from the store whenever its ranges change"""
+        p = figure(width=plot_width, height=plot_height, min_border_left=100, x_axis_label='Position (bp)', y_axis_label='Position (bp)', tools="pan, reset, box_zoom, wheel_zoom, crosshair",
+                   x_range=Range1d(0, x_end), y_range=Range1d(0, y_end))
+        p.toolbar.active_scroll = p.select_one(WheelZoomTool)
+        p.output_backend = output_backend
+        p.xgrid.visible = False
+        p.ygrid.visible = False
+        p.xaxis.formatter = NumeralTickFormatter(format="0,0")
+        p.yaxis.formatter = NumeralTickFormatter(format="0,0")
+        p.toolbar.autohide = True
+
+        # Contig boundaries are few enough to send once
+        boundaries = boundary_sources(x_cumulative_length_dict, y_cumulative_length_dict)
+        plot_boundaries(p, "x", boundaries)
+        plot_boundaries(p, "y", boundaries)
+
+        feature_sources = {}
+        for axis, index in features.items():
+            feature_sources[axis] = ColumnDataSource(data={'start': [], 'end': []})
+            if axis == "x":
+                p.vstrip(x0='start', x1='end', source=feature_sources[axis], fill_color='green', fill_alpha=0.3, line_color='#cccccc', line_alpha=0.3)
+            elif axis == "y":
+                p.hstrip(y0='start', y1='end', source=feature_sources[axis], fill_color='green', fill_alpha=0.3, line_color='#cccccc', line_alpha=0.3)
+
+        mapper = LinearColorMapper(palette=cmap_hex, low=identity_low, high=identity_high)
+        source = ColumnDataSource(data={'x0': [], 'y0': [], 'x1': [], 'y1': [], 'query': [], 'subject': [], 'identity': []})
+        segment = p.segment('x0', 'y0', 'x1', 'y1', color=transform('identity', mapper), source=source, line_width=1)
+        p.add_tools(HoverTool(renderers=[segment], tooltips=[("x", "@query{custom}"), ("y", "@subject{custom}"), ("identity", "@identity")],
+                              formatters={'@query': contig_hover(x_names), '@subject': contig_hover(y_names)}))
+        p.add_layout(ColorBar(color_mapper=mapper, width=int(plot_width*0.8), location=(0, 0), title="Nucleotide Identity (%)", bar_line_color='black', major_tick_line_color='black'), 'below')
+
+        # The panels are built as in the html, with sources the server refills instead of levels embedded in the page
+        shared = {"x": (p.x_range, plot_width, x_end), "y": (p.y_range, plot_height, y_end)}
+        names = {"x": x_names, "y": y_names}
+        x_panels, y_panels = [], []
+        track_sources = {}
+        for axis, levels in tracks.items():
+            title, feature_name, colour = (x_track_title, x_track_feature_name, x_track_colour) if axis == "x" else (y_track_title, y_track_feature_name, y_track_colour)
+            panel, track_sources[axis] = track_panel(levels, axis, *shared[axis], title, feature_name, colour, names[axis], output_backend, boundaries, embed=False)
+            (x_panels if axis == "x" else y_panels).append(panel)
+
+        annotation_sources = {}
+        for axis, (index, levels) in annotations.items():
+            panel, annotation_sources[axis] = annotation_panel(index, levels, axis, *shared[axis], names[axis], output_backend, boundaries, embed=False)
+            if axis == "x":
+                x_panels.append(panel)
+            elif axis == "y":
+                y_panels.insert(0, panel)
+
+        status = Div(text="", width=plot_width)
+        details = Div(text="Tap an alignment for its details, or select a box to summarise all alignments in it", width=plot_width)
+
+        def location(names, cumulative_length_dict, code, start, end):
+            """contig name and contig coordinates of a cumulative interval"""
+            offset = cumulative_length_dict[names[code]]
+            return f"{names[code]}:{int(start) - offset:,}-{int(end) - offset:,}"
+
+        def tap(event):
+            """show the alignment nearest to the tap, if it is within a few pixels"""
+            x_scale = (p.x_range.end - p.x_range.start) / plot_width
+            y_scale = (p.y_range.end - p.y_range.start) / plot_height
+            found = nearest_segment(store, event.x, event.y, x_scale, y_scale, SERVE_TAP_DISTANCE)
+            if found is None:
+                return
+            i = found[0]
+            x0, x1, y0, y1 = (store[name][i] for name in ('x0', 'x1', 'y0', 'y1'))
+            text = f"x {location(x_names, x_cumulative_length_dict, store['query'][i], x0, x1)}, y {location(y_names, y_cumulative_length_dict, store['subject'][i], min(y0, y1), max(y0, y1))}"
+            text += f", {'reverse' if y1 < y0 else 'forward'} strand, identity {store['identity'][i]:.2f}%"
+            if 'members' in store:
+                text += f", chain of {store['members'][i]} alignments"
+            details.text = text
+
+        def select(event):
+            """summarise every alignment overlapping a finished box selection"""
+            if not event.final or event.geometry.get('type') != "rect":
+                return
+            rows = segments_in_rectangle(store, *(event.geometry[bound] for bound in ('x0', 'x1', 'y0', 'y1')))
+            if not len(rows):
+                details.text = "No alignments in the selected box"
+                return
+            length = np.abs(store['x1'][rows] - store['x0'][rows])
+            identity = np.average(store['identity'][rows], weights=np.maximum(length, 1))
+            pairs, counts = np.unique(np.column_stack((store['query'][rows], store['subject'][rows])), axis=0, return_counts=True)
+            top = np.argsort(-counts, kind='stable')[:5]
+            details.text = f"{len(rows):,} alignments covering {int(length.sum()):,} bp of x at {identity:.2f}% identity; most between " + \
+                ", ".join(f"{x_names[pairs[j][0]]} and {y_names[pairs[j][1]]} ({counts[j]:,})" for j in top)
+
+        def update(x_start, x_stop, y_start, y_stop):
+            """refill every source with what lies in the view"""
+            window = segments_in_rectangle(store, x_start, x_stop, y_start, y_stop)
+            x0, y0, x1, y1 = (store[name][window] for name in ('x0', 'y0', 'x1', 'y1'))
+            shown = window[decimate_segments(x0, y0, x1, y1, x_start, x_stop, y_start, y_stop, plot_width, plot_height, segment_limit)]
+            data = {name: store[name][shown].astype(coordinate_type) for name in ('x0', 'y0', 'x1', 'y1')}
+            data.update({name: np.asarray(store[name][shown]) for name in ('query', 'subject', 'identity')})
+            source.data = data
+            status.text = f"{len(shown):,} of {len(window):,} alignments in view drawn"
+            views = {"x": (x_start, x_stop, plot_width), "y": (y_start, y_stop, plot_height)}
+            for axis, index in features.items():
+                start, end, pixels = views[axis]
+                lo, hi = annotation_window(index, start, end)
+                blocks = annotation_blocks(index, lo, hi, (end - start) / pixels)
+                feature_sources[axis].data = {'start': blocks['start'], 'end': blocks['end']}
+            for axis, levels in tracks.items():
+                bin_size, data = track_window(levels, *views[axis])
+                track_sources[axis].data = {**data, 'bin': np.full(len(data['position']), bin_size)}
+            for axis, (index, levels) in annotations.items():
+                start, end, pixels = views[axis]
+                annotation_sources[axis][0].data, annotation_sources[axis][1].data = annotation_glyphs(index, names[axis], start, end, pixels, levels=levels)
+
+        update(0, x_end, 0, y_end)
+        p.on_event(RangesUpdate, lambda event: update(event.x0, event.x1, event.y0, event.y1))
+        p.on_event(Tap, tap)
+        p.on_event(SelectionGeometry, select)
+        p.add_tools(BoxSelectTool(renderers=[segment]))
+
+        title = Div(text=f"<h1>{plot_title}</h1>", width=plot_width, height=50, styles={'text-align': 'center'})
+        doc.add_root(column(title, *x_panels, row(p, *y_panels), status, details))
+        doc.title = plot_title
+
+    try:
+        server = Server({'/': Application(FunctionHandler(make_document))}, port=port)
+        server.start()
+        print(f"Serving {plot_title} at http://localhost:{port}/, press Ctrl+C to stop")
+        server.io_loop.start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if temporary is not None:
+            shutil.rmtree(temporary, ignore_errors=True)
+
+def read_manifest(manifest_file):
+    """read a tab-separated batch manifest with a header line naming its columns; empty cells are treated as missing"""
+    import csv
+    with open_text_input(manifest_file) as handle:
+        reader = csv.DictReader(handle, delimiter="\t")
+        columns = reader.fieldnames or []
+        missing = [column for column in MANIFEST_REQUIRED_COLUMNS if column not in columns]
+        if missing:
+            raise ValueError(f"manifest {manifest_file} is missing the columns {', '.join(missing)}")
+        if not any(column in columns for column in MANIFEST_ALIGNMENT_COLUMNS):
+            raise ValueError(f"manifest {manifest_file} needs one of the columns {', '.join(MANIFEST_ALIGNMENT_COLUMNS)}")
+        rows = []
+        for line, row in enumerate(reader, start=2):
+            row = {column: value.strip() for column, value in row.items() if column and value and value.strip()}
+            if not all(column in row for column in MANIFEST_REQUIRED_COLUMNS) or not any(column in row for column in MANIFEST_ALIGNMENT_COLUMNS):
+                raise ValueError(f"line {line} of manifest {manifest_file} needs an alignment file, both index files and an output prefix")
+            rows.append(row)
+    return rows
+
+def bed_parser(column):
+    """parse function for a manifest bed column"""
+    if "feature" in column:
+        return load_bed_columns
+    if "track" in column:
+        return track
+    return annotation
+
+def load_manifest_inputs(rows):
+    """parse every index file and every (bed file, index file) pair in the manifest once, all at the same time"""
+    index_files = sorted({row[column] for row in rows for column in ("x_index_file", "y_index_file")})
+    indexes = load_concurrently({index_file: partial(index_assembly, index_file) for index_file in index_files})
+    beds = {(column, row[column], row[f"{column[0]}_index_file"]) for row in rows for column in MANIFEST_BED_COLUMNS if column in row}
+    names = {f"{bed_file} as {column.replace('_', ' ')} of {index_file}": (column, bed_file, index_file) for column, bed_file, index_file in beds}
+    parsed = load_concurrently({name: partial(bed_parser(names[name][0]), names[name][1], indexes[names[name][2]]) for name in sorted(names)})
+    return indexes, {names[name]: bed for name, bed in parsed.items()}
+
+# parsed index and bed files of a batch run, set once in each worker process and only read afterwards
+batch_inputs = {}
+
+def init_batch_worker(indexes, beds):
+    """keep the parsed manifest inputs for the pairs this worker plots"""
+    batch_inputs["indexes"] = indexes
+    batch_inputs["beds"] = beds
+
+def plot_pair(row, options):
+    """plot one manifest row from the shared inputs, returning the row, whether it worked and how long it took"""
+    indexes, beds = batch_inputs["indexes"], batch_inputs["beds"]
+    start = time.perf_counter()
+    try:
+        files = {column: row.get(column) for column in MANIFEST_ALIGNMENT_COLUMNS + MANIFEST_BED_COLUMNS}
+        plot_interactive_bokeh(x_cumulative_length_dict=indexes[row["x_index_file"]], y_cumulative_length_dict=indexes[row["y_index_file"]], output_prefix=row["output_prefix"],
+                               **{**options, **files, "plot_title": row.get("plot_title", options["plot_title"])},
+                               loaded={column.replace("_", " "): beds[(column, row[column], row[f"{column[0]}_index_file"])] for column in MANIFEST_BED_COLUMNS if column in row})
+        status = "ok"
+    except Exception as error:
+        status = f"failed: {error}"
+    return row, status, time.perf_counter() - start
+
+def plot_batch(manifest_file, summary_file, workers, options):
+    """plot every row of a manifest on a process pool sharing one copy of the parsed index and bed files, and write a table of per-pair timings"""
+    rows = read_manifest(manifest_file)
+    indexes, beds = load_manifest_inputs(rows)
+    # workers are forked explicitly where the platform can, since the default start method differs between platforms and
+    # Python versions, so the parsed inputs are inherited; elsewhere each worker gets one pickled copy through initargs
+    context = get_context("fork" if "fork" in get_all_start_methods() else None)
+    with ProcessPoolExecutor(max(min(workers, len(rows)), 1), mp_context=context, initializer=init_batch_worker, initargs=(indexes, beds)) as pool:
+        futures = [pool.submit(plot_pair, row, options) for row in rows]
+        results = []
+        for future in as_completed(futures):
+            row, status, seconds = future.result()
+            print(f"Plotted {row['output_prefix']} in {seconds:.2f} s ({status})")
+            results.append((row, status, seconds))
+    results.sort(key=lambda result: rows.index(result[0]))
+    with open(summary_file, "w") as summary:
+        summary.write("output_prefix\talignment_file\tx_index_file\ty_index_file\tstatus\tseconds\n")
+        for row, status, seconds in results:
+            alignment_file = next(row[column] for column in MANIFEST_ALIGNMENT_COLUMNS if column in row)
+            summary.write(f"{row['output_prefix']}\t{alignment_file}\t{row['x_index_file']}\t{row['y_index_file']}\t{status}\t{seconds:.2f}\n")
+    print(f"Wrote {summary_file}")
+    return results
+
+def import_report(modules=RENDERING_MODULES):
+    """print how long a fresh interpreter takes to start, to import the parsing core and to import each rendering library"""
+    import subprocess
+    core = f"import sys; sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r}); import hyraxdotplot"
+    timings = {"interpreter": "pass", "parsing core (hyraxdotplot)": core}
+    timings.update({module: f"import {module}" for module in modules})
+    baseline = None
+    for name, code in timings.items():
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        seconds = time.perf_counter() - start
+        if baseline is None:
+            baseline = seconds
+            print(f"Startup of {name}: {seconds:.2f} s")
+        else:
+            print(f"Import of {name}: {seconds - baseline:.2f} s")
 
 def main():
     
@@ -1117,8 +2607,9 @@ def main():
     """)
 
     parser = argparse.ArgumentParser()
-    parser.add_argument("--coords_file", metavar="FILE", help="nucmer coordinates file generated with -T and -l flags; x-axis fasta should be the query sequence and y-axis fasta should be the subject sequence (i.e. nucmer x.fasta y.fasta)")
-    parser.add_argument("--paf_file", metavar="FILE", help="minimap2 paf file generated with -c flag or FastGA paf file with the 'de' tag available; x-axis fasta should be the query sequence and y-axis fasta should be the subject sequence (i.e. minimap2/FastGA x.fasta y.fasta)")
+    parser.add_argument("--coords_file", metavar="FILE", help="nucmer coordinates file generated with -T and -l flags, or - to read it from stdin; x-axis fasta should be the query sequence and y-axis fasta should be the subject sequence (i.e. nucmer x.fasta y.fasta)")
+    parser.add_argument("--paf_file", metavar="FILE", help="minimap2 paf file generated with -c flag or FastGA paf file with the 'de' tag available, or - to read it from stdin; x-axis fasta should be the query sequence and y-axis fasta should be the subject sequence (i.e. minimap2/FastGA x.fasta y.fasta)")
+    parser.add_argument("--delta_file", metavar="FILE", help="nucmer delta file, read directly without running show-coords, or - to read it from stdin; x-axis fasta should be the reference sequence and y-axis fasta should be the query sequence (i.e. nucmer x.fasta y.fasta)")
     parser.add_argument("--x_index_file", metavar="FILE", help="samtools .fai file of fasta to be on x-axis of dotplot")
     parser.add_argument("--y_index_file", metavar="FILE", help="samtools .fai file of fasta to be on y-axis of dotplot")
     parser.add_argument("--threshold", metavar="FLOAT", type=float, default=90, help="(optional) minimum nucleotide identity of matches to be plotted; default is 90")
@@ -1140,13 +2631,51 @@ def main():
     parser.add_argument("--x_annotation_bed_file", metavar="FILE", help="(optional) gene or repeat annotation bed file for x-axis fasta")
     parser.add_argument("--y_annotation_bed_file", metavar="FILE", help="(optional) gene or repeat annotation bed file for y-axis fasta")
     parser.add_argument("--curation_mode", action='store_true', help="(optional) flag that adds tap tool and allows you to select sequences of interest")
+    parser.add_argument("--x_region", metavar="STR", help="(optional) only plot this region of the x-axis fasta, e.g. chr3:10,000,000-25,000,000; paf and coords files are read through a sidecar index (FILE.hdi.npz) built on first use")
+    parser.add_argument("--y_region", metavar="STR", help="(optional) only plot this region of the y-axis fasta, e.g. chr3:10,000,000-25,000,000")
+    parser.add_argument("--threads", metavar="INT", type=int, default=1, help="(optional) number of processes used to parse the alignment file; default is 1")
+    parser.add_argument("--cache_dir", metavar="DIR", help="(optional) directory in which parsed alignments are cached for re-plotting the same alignment file")
+    parser.add_argument("--chain_gap", metavar="INT", type=int, help="(optional) merge adjacent collinear alignments on the same sequence pair and strand into one chain when they are at most this many bp apart on both axes; chains are plotted with their length-weighted identity")
+    parser.add_argument("--max_alignments", metavar="INT", type=int, help="(optional) plot at most this many alignments, keeping the longest of each sequence pair with a fair share per pair so small sequences are not lost; the number dropped per pair is reported")
+    parser.add_argument("--overview_threshold", metavar="INT", type=int, default=OVERVIEW_THRESHOLD, help="(optional) when more alignments than this are in view, the dot plot shows pre-rendered identity images instead of individual alignments, and so does the static png; the svg always draws every alignment; default is 200000")
+    parser.add_argument("--overview_levels", metavar="INT", type=int, default=OVERVIEW_LEVELS, help="(optional) number of image resolutions embedded for the overview, the first at the plot size and each twice as fine as the previous one, so the images stay sharp up to 2**(levels-1) times zoom; finer images are embedded only where they hold alignments; default is 3")
+    parser.add_argument("--outputs", metavar="STR", default=",".join(OUTPUTS), help="(optional) comma-separated files to write, any of html, png and svg; they are written at the same time in separate processes; default is html,png,svg")
+    parser.add_argument("--serve", action='store_true', help="(optional) serve the dot plot from a bokeh server instead of writing files; only the alignments, track bins and annotations in view are sent to the browser on each pan and zoom, read from a grid index kept in --cache_dir (or a temporary directory)")
+    parser.add_argument("--port", metavar="INT", type=int, default=SERVE_PORT, help="(optional) port of the --serve mode; default is 5006")
+    parser.add_argument("--manifest", metavar="FILE", help="(optional) tab-separated file with a header line and one plot per row, with the columns paf_file (or coords_file/delta_file), x_index_file, y_index_file and output_prefix, and optionally plot_title and any of the bed file options (e.g. x_track_bed_file); every index and bed file is parsed once and the pairs are plotted in parallel with the other options applied to all of them")
+    parser.add_argument("--workers", metavar="INT", type=int, default=os.cpu_count(), help="(optional) number of pairs plotted at the same time with --manifest; default is the number of cpus")
+    parser.add_argument("--summary_file", metavar="FILE", default="hyraxdotplot.batch.tsv", help="(optional) table of per-pair status and timings written with --manifest; default is hyraxdotplot.batch.tsv")
+    parser.add_argument("--import_report", action='store_true', help="(optional) report how long the interpreter, the parsing core and each rendering library take to import, then exit")
+    parser.add_argument("--backend", choices=["webgl", "canvas", "svg"], default="webgl", help="(optional) rendering backend of the interactive html; webgl keeps large plots responsive when panning and zooming, the static png and svg are drawn separately without a browser; default is webgl")
+    parser.add_argument("--cache_size", metavar="FLOAT", type=float, default=20, help="(optional) maximum size of the cache directory in GB; least recently used entries are removed first; default is 20")
 
     args = parser.parse_args()
 
+    if args.import_report:
+        import_report()
+        sys.exit(0)
+
+    outputs = [output.strip().lower() for output in args.outputs.split(",") if output.strip()]
+    unknown_outputs = [output for output in outputs if output not in OUTPUTS]
+    if unknown_outputs or not outputs:
+        print(f"Error: --outputs must list one or more of {', '.join(OUTPUTS)}")
+        sys.exit(1)
+
+    if args.manifest:
+        options = dict(threshold=args.threshold, size_threshold=args.size_threshold, plot_title=args.plot_title, plot_width=args.plot_width, plot_height=args.plot_height, x_track_title=args.x_track_title, x_track_feature_name=args.x_track_feature_name, x_track_colour=args.x_track_colour, y_track_title=args.y_track_title, y_track_feature_name=args.y_track_feature_name, y_track_colour=args.y_track_colour, curation_mode=args.curation_mode, threads=args.threads, cache_dir=args.cache_dir, cache_size=int(args.cache_size * 1024 ** 3), output_backend=args.backend, chain_gap=args.chain_gap, max_alignments=args.max_alignments, overview_threshold=args.overview_threshold, overview_levels=args.overview_levels, outputs=outputs)
+        try:
+            results = plot_batch(args.manifest, args.summary_file, args.workers, options)
+        except ValueError as error:
+            print(f"Error: {error}")
+            sys.exit(1)
+        failed = [row for row, status, _ in results if status != "ok"]
+        print(f"Plotted {len(results) - len(failed)} of {len(results)} pairs, enjoy your plots")
+        sys.exit(1 if failed else 0)
+
     # Check if positional arguments are missing and print an error message if they are
     
-    if not args.coords_file and not args.paf_file:
-        print("Error: Please submit a nucmer coords file or a paf file with the de tag available")
+    if not args.coords_file and not args.paf_file and not args.delta_file:
+        print("Error: Please submit a nucmer coords file, a nucmer delta file or a paf file with the de tag available")
     
     missing_args = []
     if not args.x_index_file:
@@ -1160,10 +2689,26 @@ def main():
         sys.exit(1)
     
 
-    xcumulative_length_dict = index_assembly(args.x_index_file)
-    ycumulative_length_dict = index_assembly(args.y_index_file)
+    indexes = load_concurrently({"x index file": partial(index_assembly, args.x_index_file), "y index file": partial(index_assembly, args.y_index_file)})
+    xcumulative_length_dict = indexes["x index file"]
+    ycumulative_length_dict = indexes["y index file"]
+
+    x_region = None
+    y_region = None
+    try:
+        if args.x_region:
+            xcumulative_length_dict, x_region = restrict_index(xcumulative_length_dict, parse_region(args.x_region))
+        if args.y_region:
+            ycumulative_length_dict, y_region = restrict_index(ycumulative_length_dict, parse_region(args.y_region))
+    except ValueError as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+
+    if args.serve:
+        serve_dotplot(coords_file=args.coords_file, paf_file=args.paf_file, delta_file=args.delta_file, threshold=args.threshold, size_threshold=args.size_threshold, x_cumulative_length_dict=xcumulative_length_dict, y_cumulative_length_dict=ycumulative_length_dict, plot_title=args.plot_title, plot_width=args.plot_width, plot_height=args.plot_height, x_feature_bed_file=args.x_feature_bed_file, y_feature_bed_file=args.y_feature_bed_file, x_track_bed_file=args.x_track_bed_file, x_track_title=args.x_track_title, x_track_feature_name=args.x_track_feature_name, x_track_colour=args.x_track_colour, y_track_bed_file=args.y_track_bed_file, y_track_title=args.y_track_title, y_track_feature_name=args.y_track_feature_name, y_track_colour=args.y_track_colour, x_annotation_bed_file=args.x_annotation_bed_file, y_annotation_bed_file=args.y_annotation_bed_file, threads=args.threads, cache_dir=args.cache_dir, cache_size=int(args.cache_size * 1024 ** 3), x_region=x_region, y_region=y_region, output_backend=args.backend, chain_gap=args.chain_gap, port=args.port)
+        sys.exit(0)
 
-    plot_interactive_bokeh(coords_file=args.coords_file, paf_file=args.paf_file, threshold=args.threshold, size_threshold=args.size_threshold,x_cumulative_length_dict=xcumulative_length_dict, y_cumulative_length_dict=ycumulative_length_dict, plot_title=args.plot_title, output_prefix=args.output_prefix, plot_width=args.plot_width, plot_height=args.plot_height, x_feature_bed_file=args.x_feature_bed_file, y_feature_bed_file=args.y_feature_bed_file, x_track_bed_file=args.x_track_bed_file, x_track_title=args.x_track_title, x_track_feature_name=args.x_track_feature_name, x_track_colour=args.x_track_colour, y_track_bed_file=args.y_track_bed_file, y_track_title=args.y_track_title, y_track_feature_name=args.y_track_feature_name, y_track_colour=args.y_track_colour, x_annotation_bed_file=args.x_annotation_bed_file, y_annotation_bed_file=args.y_annotation_bed_file, curation_mode=args.curation_mode)
+    plot_interactive_bokeh(coords_file=args.coords_file, paf_file=args.paf_file, delta_file=args.delta_file, threshold=args.threshold, size_threshold=args.size_threshold,x_cumulative_length_dict=xcumulative_length_dict, y_cumulative_length_dict=ycumulative_length_dict, plot_title=args.plot_title, output_prefix=args.output_prefix, plot_width=args.plot_width, plot_height=args.plot_height, x_feature_bed_file=args.x_feature_bed_file, y_feature_bed_file=args.y_feature_bed_file, x_track_bed_file=args.x_track_bed_file, x_track_title=args.x_track_title, x_track_feature_name=args.x_track_feature_name, x_track_colour=args.x_track_colour, y_track_bed_file=args.y_track_bed_file, y_track_title=args.y_track_title, y_track_feature_name=args.y_track_feature_name, y_track_colour=args.y_track_colour, x_annotation_bed_file=args.x_annotation_bed_file, y_annotation_bed_file=args.y_annotation_bed_file, curation_mode=args.curation_mode, threads=args.threads, cache_dir=args.cache_dir, cache_size=int(args.cache_size * 1024 ** 3), x_region=x_region, y_region=y_region, output_backend=args.backend, chain_gap=args.chain_gap, max_alignments=args.max_alignments, overview_threshold=args.overview_threshold, overview_levels=args.overview_levels, outputs=outputs)
 
     
     print("""Plotting finished, enjoy your plot""")